@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""Load time of config.yaml and read cost of the resulting settings
+
+Times each stage of Settings.from_file() (YAML parsing with the pure-Python
+and, when available, the libyaml loader, then validation) and compares a
+setting read on the frozen, slotted sections with the same read on a
+plain dataclass.
+
+Usage: scripts/bench_settings_load.py [CONFIG_FILE]
+"""
+
+import dataclasses
+import os
+import sys
+import timeit
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+DEFAULT_CONFIG = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "config", "config.yaml")
+LOADS = 200
+READS = 1_000_000
+
+
+def per_call(statement, number: int) -> float:
+    """Best-of-five seconds per call"""
+    return min(timeit.repeat(statement, number=number, repeat=5)) / number
+
+
+def main():
+    sys.path.insert(0, SRC_DIR)
+    import yaml
+    from config.settings import SECTION_CLASSES, Settings, read_config_file, validate_section
+
+    config_file = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_CONFIG
+    with open(config_file) as f:
+        text = f.read()
+
+    parsed = yaml.safe_load(text)
+    stages = [("yaml SafeLoader", lambda: yaml.load(text, Loader=yaml.SafeLoader))]
+    if hasattr(yaml, "CSafeLoader"):
+        stages.append(("yaml CSafeLoader", lambda: yaml.load(text, Loader=yaml.CSafeLoader)))
+    stages += [
+        ("validate", lambda: {
+            section: validate_section(section, parsed[section])
+            for section in SECTION_CLASSES if section in parsed
+        }),
+        ("read_config_file", lambda: read_config_file(config_file)),
+        ("Settings.from_file", lambda: Settings.from_file(config_file)),
+    ]
+
+    print(f"Loading {config_file}")
+    for name, statement in stages:
+        print(f"  {name:<20} {per_call(statement, LOADS) * 1e6:8.1f} us")
+
+    settings = Settings.from_file(config_file)
+    display_class = SECTION_CLASSES["display"]
+    PlainDisplay = dataclasses.make_dataclass(
+        "PlainDisplay", [(f.name, f.type, f.default) for f in dataclasses.fields(display_class)]
+    )
+    plain = PlainDisplay(**dataclasses.asdict(settings.display))
+
+    frozen = settings.display
+    slotted = per_call(lambda: frozen.slideshow_interval, READS)
+    unslotted = per_call(lambda: plain.slideshow_interval, READS)
+    print("Reading display.slideshow_interval")
+    print(f"  {'frozen, slots':<20} {slotted * 1e9:8.1f} ns")
+    print(f"  {'plain dataclass':<20} {unslotted * 1e9:8.1f} ns")
+    print(f"  {'section size':<20} {sys.getsizeof(frozen):5d} B vs "
+          f"{sys.getsizeof(plain) + sys.getsizeof(plain.__dict__)} B")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""Resident memory of the slideshow image list versus library size
+
+Compares the old representation (a list of Path objects plus a shuffled
+copy) with the packed PathTable and a FeistelPermutation. The MediaIndex
+column is the shared index both sit on top of: it keeps a path string and
+a (size, mtime) signature per file, so it still grows with the library.
+Every case runs in a fresh interpreter so the RSS deltas do not share
+allocator state.
+
+Usage: scripts/bench_slideshow_memory.py [SIZE ...]
+"""
+
+import os
+import subprocess
+import sys
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+DEFAULT_SIZES = [1_000, 10_000, 50_000, 100_000, 250_000]
+
+
+def rss_kb() -> int:
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1])
+    return 0
+
+
+def fake_paths(count: int):
+    for i in range(count):
+        yield f"/home/pi/ww2_kiosk/media/pictures/archive_scan_{i:07d}.jpg"
+
+
+def run_case(approach: str, count: int) -> int:
+    """Build one representation and return the RSS it added, in KiB"""
+    import random
+    from pathlib import Path
+    from types import SimpleNamespace
+
+    sys.path.insert(0, SRC_DIR)
+    from media.media_index import MediaIndex
+    from media.path_table import PathTable
+    from media.permutation import FeistelPermutation
+
+    if approach == "index":
+        media = SimpleNamespace(videos_dir="/tmp", pictures_dir="/tmp",
+                                upload_settle_time=0, rescan_interval=0)
+        index = MediaIndex(SimpleNamespace(media=media))
+    before = rss_kb()
+    if approach == "index":
+        index._apply_scan('pictures', {path: (1_000_000, 0) for path in fake_paths(count)}, settle=False)
+        index._outbox.clear()
+        sample = index.contains(next(fake_paths(1)))
+    elif approach == "list":
+        images = [Path(path) for path in fake_paths(count)]
+        order = list(images)
+        random.shuffle(order)
+        sample = order[count // 2]
+    else:
+        images = PathTable(fake_paths(count))
+        order = FeistelPermutation(len(images), seed=1)
+        sample = images[order[count // 2]]
+    assert sample
+    return rss_kb() - before
+
+
+def main():
+    if len(sys.argv) == 4 and sys.argv[1] == "--case":
+        print(run_case(sys.argv[2], int(sys.argv[3])))
+        return
+
+    sizes = [int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES
+    print(f"{'images':>10} {'list+shuffle':>14} {'PathTable':>12} {'ratio':>7} {'MediaIndex':>12}")
+    for count in sizes:
+        results = {}
+        for approach in ("list", "table", "index"):
+            output = subprocess.run(
+                [sys.executable, __file__, "--case", approach, str(count)],
+                capture_output=True, text=True, check=True
+            ).stdout
+            results[approach] = int(output.strip())
+        ratio = results["list"] / results["table"] if results["table"] > 0 else float("inf")
+        print(
+            f"{count:>10} {results['list'] / 1024:>11.1f} MB "
+            f"{results['table'] / 1024:>9.1f} MB {ratio:>6.1f}x "
+            f"{results['index'] / 1024:>9.1f} MB"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+import asyncio
+import logging
+import os
+import shutil
+from pathlib import Path
+from typing import Any, Callable, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+# Seconds a save waits for further changes, so a burst of edits costs one
+# write of the SD card instead of one per edit
+SAVE_DELAY = 2.0
+
+BACKUP_SUFFIX = ".bak"
+
+
+def backup_path(path: Union[str, Path]) -> Path:
+    """Where the last known good version of path is kept"""
+    path = Path(path)
+    return path.with_name(path.name + BACKUP_SUFFIX)
+
+
+def _fsync_dir(directory: Path):
+    # Makes the rename itself durable, not just the file contents
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def _keep_backup(path: Path, validate: Optional[Callable[[Path], Any]]):
+    """Copy the current file to its backup, if it is one worth falling back to"""
+    if validate:
+        try:
+            validate(path)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Not backing up {path}, it is invalid: {e}")
+            return
+    
+    backup = backup_path(path)
+    staged = backup.with_name(f".{backup.name}.{os.getpid()}.tmp")
+    try:
+        try:
+            os.link(path, staged)
+        except OSError:
+            # No hard links on this filesystem
+            shutil.copy2(path, staged)
+        os.replace(staged, backup)
+    except OSError as e:
+        logger.warning(f"Could not back up {path}: {e}")
+    finally:
+        if staged.exists():
+            staged.unlink()
+
+
+def atomic_write(path: Union[str, Path], content: str, mode: int = 0o644,
+                 validate: Optional[Callable[[Path], Any]] = None, backup: bool = True) -> bool:
+    """Replace a file so that a crash leaves either the old or the new contents
+
+    The new contents go to a temporary file in the same directory, are
+    fsynced and then renamed over the original. With backup, the original is
+    first kept as path.bak unless validate(path) raises ValueError or OSError
+    for it. Returns False without touching the disk if the file already
+    holds content byte for byte.
+    """
+    path = Path(path)
+    data = content.encode()
+    try:
+        if path.read_bytes() == data:
+            logger.debug(f"{path} unchanged")
+            return False
+        existing = True
+    except OSError:
+        existing = False
+    
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_file = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    try:
+        fd = os.open(tmp_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, mode)
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        if existing and backup:
+            _keep_backup(path, validate)
+        os.replace(tmp_file, path)
+    finally:
+        if tmp_file.exists():
+            tmp_file.unlink()
+    _fsync_dir(path.parent)
+    
+    logger.debug(f"{path} written")
+    return True
+
+
+def read_with_backup(path: Union[str, Path], reader: Callable[[Path], Any]) -> Any:
+    """reader(path), or reader of the backup if path is missing or invalid
+
+    This recovers the last good copy when a power cut interrupted a save, or
+    left a truncated file behind. Raises the error for path itself if the backup cannot be read either.
+    """
+    path = Path(path)
+    try:
+        return reader(path)
+    except (OSError, ValueError) as e:
+        backup = backup_path(path)
+        if not backup.exists():
+            raise
+        try:
+            value = reader(backup)
+        except (OSError, ValueError):
+            raise e from None
+        logger.warning(f"{path} is unusable ({e}), using last good copy {backup}")
+        return value
+
+
+class DeferredWriter:
+    """Batches saves of one file into a single atomic write
+
+    save() marks the file dirty; the contents are rendered and written
+    SAVE_DELAY seconds after the first save of a burst. Without a running
+    event loop, as in scripts, save() writes at once. Call flush() before
+    exiting so a pending save is not lost.
+    """
+        
+    def __init__(self, path: Callable[[], Union[str, Path]], render: Callable[[], str],
+                 validate: Optional[Callable[[Path], Any]] = None, delay: float = SAVE_DELAY,
+                 description: str = "file"):
+        self.path = path
+        self.render = render
+        self.validate = validate
+        self.delay = delay
+        self.description = description
+        self._pending: Optional[asyncio.TimerHandle] = None
+        
+    @property
+    def dirty(self) -> bool:
+        return self._pending is not None
+        
+    def save(self):
+        if self._pending:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self._write()
+            return
+        self._pending = loop.call_later(self.delay, self.flush)
+        
+    def flush(self) -> bool:
+        """Write now if there are unsaved changes; True if the file was written"""
+        if not self._pending:
+            return False
+        self._pending.cancel()
+        self._pending = None
+        return self._write()
+        
+    def _write(self) -> bool:
+        try:
+            written = atomic_write(self.path(), self.render(), validate=self.validate)
+        except Exception as e:
+            logger.error(f"Failed to save {self.description}: {e}")
+            return False
+        if written:
+            logger.info(f"{self.description.capitalize()} saved")
+        return written
\ No newline at end of file
@@ -1,39 +1,86 @@
+import logging
 import os
 import yaml
 from pathlib import Path
-from dataclasses import dataclass, field
-from typing import Optional
+from dataclasses import InitVar, asdict, dataclass, field, fields, replace
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
+from .persistence import atomic_write, read_with_backup
 
-@dataclass
+logger = logging.getLogger(__name__)
+
+# Settings where not every value of their type is valid
+SETTING_CHOICES = {
+    'display.video_player': ('vlc', 'omxplayer'),
+    'display.video_backend': ('libvlc', 'subprocess'),
+    'display.hw_decode': ('auto', 'v4l2m2m', 'drm', 'mmal', 'software'),
+    'display.preemption_policy': ('ignore', 'restart', 'switch', 'queue'),
+}
+
+# Settings that no longer exist, with what replaced them; still found in
+# config files written for older versions, so they are reported, not applied
+RETIRED_SETTINGS = {
+    'display.idle_timeout': (
+        "the slideshow now resumes as soon as a video ends; set display.video_post_roll "
+        "to linger after a video, and display.video_stall_timeout for how long a video "
+        "may make no progress before it is abandoned"
+    ),
+}
+
+
+@dataclass(frozen=True, slots=True)
 class DisplaySettings:
     fullscreen: bool = True
     width: int = 1920
     height: int = 1080
     slideshow_interval: int = 10  # seconds
     transition_duration: float = 1.0  # seconds
+    transition_fps: int = 30  # target frame rate for cross-fades
     shuffle_slideshow: bool = True
-    idle_timeout: int = 30  # seconds to return to slideshow after video
+    video_stall_timeout: int = 30  # seconds without playback progress before a video is treated as stuck
+    video_post_roll: float = 0.0  # seconds to linger after a video before resuming the slideshow
     video_player: str = "vlc"  # vlc or omxplayer
+    video_backend: str = "libvlc"  # libvlc (persistent player) or subprocess
+    hw_decode: str = "auto"  # auto, or force v4l2m2m, drm, mmal or software
+    preemption_policy: str = "switch"  # ignore, restart, switch or queue presses during a video
+    video_stop_timeout: float = 0.5  # seconds to wait for a player process to exit before killing it
+    surface_cache_mb: int = 64  # in-memory budget for decoded slides
+    prefetch_depth: int = 3  # upcoming slides decoded ahead of time
+    prefetch_workers: int = 2  # threads used for slide decoding
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class InputSettings:
     button1_pin: int = 17
     button2_pin: int = 27
     button3_pin: int = 22
     button4_pin: int = 23
     debounce_time: int = 50  # milliseconds
+    mapping_check_interval: float = 5.0  # seconds between checks for edited config files
+    event_queue_size: int = 4  # button presses held while the player is busy
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class MediaSettings:
     base_dir: str = "/home/pi/ww2_kiosk/media"
     videos_dir: str = "/home/pi/ww2_kiosk/media/videos"
     pictures_dir: str = "/home/pi/ww2_kiosk/media/pictures"
+    cache_dir: str = "/home/pi/ww2_kiosk/cache"
+    frame_cache_mb: int = 2048  # on-disk budget for pre-scaled slide frames
+    catalog_file: str = "/home/pi/ww2_kiosk/cache/catalog.db"
+    upload_settle_time: float = 3.0  # seconds a new file must be unchanged before use
+    rescan_interval: float = 30.0  # polling interval when inotify is unavailable
+    transcode_enabled: bool = True  # make Pi-optimized renditions of uploaded videos
+    transcode_workers: int = 1  # concurrent ffmpeg jobs
+    transcode_threads: int = 2  # threads per ffmpeg job
+    ingest_workers: int = 2  # processes writing screen-sized picture derivatives
+    prewarm_enabled: bool = True  # keep the start of every button's video in the page cache
+    prewarm_head_mb: int = 32  # megabytes read ahead from the start of each mapped video
+    prewarm_interval: float = 300.0  # seconds between re-warming passes
+    prewarm_reserve_mb: int = 256  # never warm into the last this many megabytes of MemAvailable
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class NetworkSettings:
     enable_ap: bool = True
     ap_ssid: str = "WW2-Kiosk-AP"
@@ -44,115 +91,279 @@ class NetworkSettings:
     smb_password: str = "kiosk123"
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class ConfigSettings:
     config_file: str = "/home/pi/ww2_kiosk/config/config.yaml"
     button_mappings_file: str = "/home/pi/ww2_kiosk/config/button_mappings.json"
     playlists_file: str = "/home/pi/ww2_kiosk/config/playlists.json"
 
 
-@dataclass
+# libyaml's parser when PyYAML was built with it, several times faster
+YAML_LOADER = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+
+
+class _YamlInt(int):
+    """A YAML integer that remembers how it was written"""
+    text = None
+
+
+class _YamlFloat(float):
+    """A YAML float that remembers how it was written"""
+    text = None
+
+
+class ConfigLoader(YAML_LOADER):
+    """YAML loader that keeps the source text of numbers for _to_str"""
+
+
+def _construct_number(number_class, construct):
+    def constructor(loader, node):
+        value = number_class(construct(loader, node))
+        value.text = node.value
+        return value
+    return constructor
+
+
+ConfigLoader.add_constructor(
+    'tag:yaml.org,2002:int', _construct_number(_YamlInt, yaml.SafeLoader.construct_yaml_int)
+)
+ConfigLoader.add_constructor(
+    'tag:yaml.org,2002:float', _construct_number(_YamlFloat, yaml.SafeLoader.construct_yaml_float)
+)
+
+# Sections of config.yaml, in file order
+SECTION_CLASSES = {
+    'display': DisplaySettings,
+    'input': InputSettings,
+    'media': MediaSettings,
+    'network': NetworkSettings,
+}
+
+TRUE_WORDS = frozenset({'true', 'yes', 'on', '1'})
+FALSE_WORDS = frozenset({'false', 'no', 'off', '0'})
+
+
+def _to_bool(key: str, value) -> bool:
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, str) and value.strip().lower() in TRUE_WORDS | FALSE_WORDS:
+        return value.strip().lower() in TRUE_WORDS
+    raise ValueError(f"{key} must be true or false, not {value!r}")
+
+
+def _to_int(key: str, value) -> int:
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    if isinstance(value, str):
+        try:
+            return int(value.strip())
+        except ValueError:
+            pass
+    if isinstance(value, int) and not isinstance(value, bool):
+        return int(value)
+    raise ValueError(f"{key} must be a whole number, not {value!r}")
+
+
+def _to_float(key: str, value) -> float:
+    if isinstance(value, str):
+        try:
+            return float(value.strip())
+        except ValueError:
+            pass
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    raise ValueError(f"{key} must be a number, not {value!r}")
+
+
+def _to_str(key: str, value) -> str:
+    if isinstance(value, str):
+        return value
+    # An unquoted all-digit password or SSID is a YAML number; take it as
+    # text only if that gives back exactly what was typed, not for 01234567
+    # (octal), 0x1F or 12345678.50
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        text = str(int(value) if isinstance(value, int) else float(value))
+        if getattr(value, 'text', None) in (None, text):
+            return text
+        raise ValueError(f"{key} must be text; quote {value.text} so it is not read as a number")
+    raise ValueError(f"{key} must be text, not {value!r}")
+
+
+COERCERS = {bool: _to_bool, int: _to_int, float: _to_float, str: _to_str}
+
+
+def _compile_check(key: str, field_type) -> Callable[[Any], Any]:
+    """Build the validator for one setting from its annotation, once at import"""
+    coerce = COERCERS[field_type]
+    choices = SETTING_CHOICES.get(key)
+    numeric = field_type in (int, float)
+    
+    def check(value):
+        value = coerce(key, value)
+        if numeric and value < 0:
+            raise ValueError(f"{key} must not be negative")
+        if choices and value not in choices:
+            raise ValueError(f"{key} must be one of {', '.join(choices)}, not {value!r}")
+        return value
+    return check
+
+
+# section -> key -> validator returning the coerced value
+SCHEMA: Dict[str, Dict[str, Callable[[Any], Any]]] = {
+    section: {f.name: _compile_check(f"{section}.{f.name}", f.type) for f in fields(section_class)}
+    for section, section_class in SECTION_CLASSES.items()
+}
+
+
+def validate_section(section: str, entries: Dict[str, Any],
+                     errors: Optional[List[str]] = None) -> Dict[str, Any]:
+    """Coerce a section's values to their declared types; unknown keys are dropped
+
+    An invalid value raises ValueError, or with an errors list is left out
+    and its message appended.
+    """
+    checks = SCHEMA[section]
+    values = {}
+    for key, value in entries.items():
+        if key not in checks:
+            continue
+        try:
+            values[key] = checks[key](value)
+        except ValueError as e:
+            if errors is None:
+                raise
+            errors.append(str(e))
+    return values
+
+
+def read_config_file(path, strict: bool = True) -> Dict[str, Dict[str, Any]]:
+    """Parse and validate config.yaml into {section: {key: value}}
+
+    Unknown keys are ignored. A bad value raises ValueError, or when not
+    strict is logged and left at its default while the rest is kept.
+    """
+    with open(path, 'r') as f:
+        try:
+            config = yaml.load(f, Loader=ConfigLoader)
+        except yaml.YAMLError as e:
+            raise ValueError(f"not valid YAML: {e}") from e
+            
+    if not isinstance(config, dict):
+        raise ValueError("expected a mapping of sections")
+        
+    values = {}
+    for section in SECTION_CLASSES:
+        entries = config.get(section)
+        if entries is None:
+            continue
+        if not isinstance(entries, dict):
+            raise ValueError(f"section {section} must be a mapping")
+        for key in entries:
+            replacement = RETIRED_SETTINGS.get(f"{section}.{key}")
+            if replacement:
+                logger.warning(f"Ignoring {section}.{key} in {path}: {replacement}")
+        errors = None if strict else []
+        values[section] = validate_section(section, entries, errors)
+        for error in errors or ():
+            logger.error(f"Ignoring invalid setting in {path}: {error}")
+    return values
+
+
+@dataclass(slots=True)
 class Settings:
+    """The kiosk's configuration: one frozen section each, replaced whole by update()"""
     display: DisplaySettings = field(default_factory=DisplaySettings)
     input: InputSettings = field(default_factory=InputSettings)
     media: MediaSettings = field(default_factory=MediaSettings)
     network: NetworkSettings = field(default_factory=NetworkSettings)
     config: ConfigSettings = field(default_factory=ConfigSettings)
+    load_file: InitVar[bool] = True
     
-    def __post_init__(self):
+    def __post_init__(self, load_file):
         # Override with environment variables if set
         self._load_from_env()
         
         # Load from config file if it exists
-        self._load_from_file()
+        if load_file:
+            self._load_from_file()
+            
+    @classmethod
+    def from_file(cls, config_file: Optional[str] = None) -> 'Settings':
+        """Settings read from config_file instead of the default location"""
+        config = ConfigSettings(config_file=config_file) if config_file else ConfigSettings()
+        return cls(config=config)
         
     def _load_from_env(self):
         """Load settings from environment variables"""
+        media = {}
+        network = {}
+        
         # Media paths
         if media_dir := os.getenv("KIOSK_MEDIA_DIR"):
-            self.media.base_dir = media_dir
-            self.media.videos_dir = f"{media_dir}/videos"
-            self.media.pictures_dir = f"{media_dir}/pictures"
+            media['base_dir'] = media_dir
+            media['videos_dir'] = f"{media_dir}/videos"
+            media['pictures_dir'] = f"{media_dir}/pictures"
             
         # Network settings
         if ap_ssid := os.getenv("KIOSK_AP_SSID"):
-            self.network.ap_ssid = ap_ssid
+            network['ap_ssid'] = ap_ssid
         if ap_password := os.getenv("KIOSK_AP_PASSWORD"):
-            self.network.ap_password = ap_password
+            network['ap_password'] = ap_password
         if smb_password := os.getenv("KIOSK_SMB_PASSWORD"):
-            self.network.smb_password = smb_password
+            network['smb_password'] = smb_password
+            
+        self.update({
+            'media': validate_section('media', media),
+            'network': validate_section('network', network),
+        })
             
     def _load_from_file(self):
         """Load settings from YAML config file"""
         config_path = Path(self.config.config_file)
         
-        if config_path.exists():
-            try:
-                with open(config_path, 'r') as f:
-                    config = yaml.safe_load(f)
-                    
-                # Update settings from config
-                if 'display' in config:
-                    for key, value in config['display'].items():
-                        if hasattr(self.display, key):
-                            setattr(self.display, key, value)
-                            
-                if 'input' in config:
-                    for key, value in config['input'].items():
-                        if hasattr(self.input, key):
-                            setattr(self.input, key, value)
-                            
-                if 'media' in config:
-                    for key, value in config['media'].items():
-                        if hasattr(self.media, key):
-                            setattr(self.media, key, value)
-                            
-                if 'network' in config:
-                    for key, value in config['network'].items():
-                        if hasattr(self.network, key):
-                            setattr(self.network, key, value)
-                            
-            except Exception as e:
-                print(f"Warning: Failed to load config file: {e}")
+        try:
+            self.update(read_with_backup(config_path, lambda path: read_config_file(path, strict=False)))
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.error(f"Failed to load config file, using defaults: {e}")
+                
+    def update(self, values: Dict[str, Dict[str, Any]]):
+        """Replace sections with copies holding already validated values"""
+        for section, entries in values.items():
+            if entries:
+                setattr(self, section, replace(getattr(self, section), **entries))
                 
+    def reload(self) -> 'Settings':
+        """Fresh settings from the defaults, the environment and the config file
+
+        Unlike at startup, a missing or invalid file raises, so a caller can
+        keep what it has instead of falling back to the defaults.
+        """
+        values = read_config_file(self.config.config_file)
+        fresh = Settings(config=self.config, load_file=False)
+        fresh.update(values)
+        return fresh
+        
+    def diff(self, other: 'Settings') -> Dict[str, Tuple[Any, Any]]:
+        """Settings that differ from other, as "section.key" -> (ours, theirs)"""
+        changes = {}
+        for section in SECTION_CLASSES:
+            ours = asdict(getattr(self, section))
+            theirs = asdict(getattr(other, section))
+            for key, value in ours.items():
+                if theirs[key] != value:
+                    changes[f"{section}.{key}"] = (value, theirs[key])
+        return changes
+        
     def save_to_file(self, path: Optional[str] = None):
-        """Save current settings to YAML file"""
+        """Save current settings to YAML file, keeping the previous one as a backup"""
         config_path = Path(path or self.config.config_file)
-        config_path.parent.mkdir(parents=True, exist_ok=True)
         
-        config = {
-            'display': {
-                'fullscreen': self.display.fullscreen,
-                'width': self.display.width,
-                'height': self.display.height,
-                'slideshow_interval': self.display.slideshow_interval,
-                'transition_duration': self.display.transition_duration,
-                'shuffle_slideshow': self.display.shuffle_slideshow,
-                'idle_timeout': self.display.idle_timeout,
-                'video_player': self.display.video_player,
-            },
-            'input': {
-                'button1_pin': self.input.button1_pin,
-                'button2_pin': self.input.button2_pin,
-                'button3_pin': self.input.button3_pin,
-                'button4_pin': self.input.button4_pin,
-                'debounce_time': self.input.debounce_time,
-            },
-            'media': {
-                'base_dir': self.media.base_dir,
-                'videos_dir': self.media.videos_dir,
-                'pictures_dir': self.media.pictures_dir,
-            },
-            'network': {
-                'enable_ap': self.network.enable_ap,
-                'ap_ssid': self.network.ap_ssid,
-                'ap_password': self.network.ap_password,
-                'ap_interface': self.network.ap_interface,
-                'enable_smb': self.network.enable_smb,
-                'smb_username': self.network.smb_username,
-                'smb_password': self.network.smb_password,
-            }
-        }
+        config = {section: asdict(getattr(self, section)) for section in SECTION_CLASSES}
         
-        with open(config_path, 'w') as f:
-            yaml.dump(config, f, default_flow_style=False)
\ No newline at end of file
+        atomic_write(
+            config_path,
+            yaml.dump(config, default_flow_style=False, sort_keys=False),
+            validate=read_config_file
+        )
\ No newline at end of file
@@ -0,0 +1,177 @@
+import asyncio
+import logging
+import os
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Settings the running kiosk picks up; everything else needs a restart
+LIVE_SETTINGS = frozenset({
+    'display.slideshow_interval',
+    'display.transition_duration',
+    'display.transition_fps',
+    'display.shuffle_slideshow',
+    'display.video_stall_timeout',
+    'display.video_post_roll',
+    'display.preemption_policy',
+    'input.mapping_check_interval',
+})
+
+# Seconds an edited file must stay unchanged before it is read, so an
+# editor or upload caught halfway through a save is not mistaken for the result
+SETTLE_TIME = 1.0
+
+
+@dataclass
+class ConfigChange:
+    """What one reload changed in the running configuration"""
+    settings: Dict[str, Tuple[Any, Any]] = field(default_factory=dict)  # "section.key" -> (old, new)
+    mappings: bool = False
+    playlists: List[str] = field(default_factory=list)  # names added, removed or edited
+        
+    def __bool__(self):
+        return bool(self.settings or self.mappings or self.playlists)
+
+
+def _signature(path) -> Optional[Tuple[int, int]]:
+    try:
+        stat = os.stat(path)
+        return stat.st_mtime_ns, stat.st_size
+    except OSError:
+        return None
+
+
+class ConfigWatcher:
+    """Applies edits to config.yaml, the button mappings and the playlists live
+
+    Each file is validated as a whole before anything is taken from it; an
+    invalid file is logged and the configuration in use is kept. Valid
+    changes are swapped in together and announced to subscribers as one
+    ConfigChange. If a subscriber fails to apply new settings, the previous
+    values are restored and announced again.
+    """
+        
+    def __init__(self, settings, button_mapper, playlist_manager):
+        self.settings = settings
+        self.button_mapper = button_mapper
+        self.playlist_manager = playlist_manager
+        
+        self._signatures: Dict[str, Optional[Tuple[int, int]]] = {}
+        self._listeners: List[Callable] = []
+        self._task = None
+        
+    def subscribe(self, callback: Callable):
+        """Register callback(change) for applied changes; it may be a coroutine"""
+        self._listeners.append(callback)
+        
+    @property
+    def _files(self) -> Dict[str, str]:
+        config = self.settings.config
+        return {
+            'settings': config.config_file,
+            'mappings': config.button_mappings_file,
+            'playlists': config.playlists_file,
+        }
+        
+    async def start(self):
+        """Take the files as loaded at startup as the baseline and start polling"""
+        self._signatures = {name: _signature(path) for name, path in self._files.items()}
+        if self._task is None:
+            self._task = asyncio.create_task(self._watch())
+        
+    async def _watch(self):
+        while True:
+            await asyncio.sleep(max(SETTLE_TIME, self.settings.input.mapping_check_interval))
+            try:
+                await self.check()
+            except Exception as e:
+                logger.error(f"Config reload failed: {e}")
+        
+    async def check(self) -> ConfigChange:
+        """Reload whichever files were edited and apply the result"""
+        files = self._files
+        seen = {name: _signature(path) for name, path in files.items()}
+        edited = [name for name, signature in seen.items() if signature != self._signatures.get(name)]
+        if not edited:
+            return ConfigChange()
+        
+        await asyncio.sleep(SETTLE_TIME)
+        change = ConfigChange()
+        for name in edited:
+            signature = _signature(files[name])
+            if signature != seen[name]:
+                # Still being written; look again next time
+                continue
+            self._signatures[name] = signature
+            if signature is None:
+                logger.warning(f"{files[name]} was removed, keeping its current contents")
+                continue
+            
+            if name == 'settings':
+                change.settings = self._reload_settings()
+            elif name == 'mappings':
+                change.mappings = self.button_mapper.reload()
+            else:
+                change.playlists = self.playlist_manager.reload()
+        
+        if change:
+            await self._announce(change)
+        return change
+        
+    def _reload_settings(self) -> Dict[str, Tuple[Any, Any]]:
+        """Validate config.yaml and assign the settings that can change live"""
+        try:
+            fresh = self.settings.reload()
+        except (OSError, ValueError) as e:
+            logger.error(f"Keeping current settings, {self.settings.config.config_file} is invalid: {e}")
+            return {}
+        
+        changes = self.settings.diff(fresh)
+        live = {key: values for key, values in changes.items() if key in LIVE_SETTINGS}
+        pending = sorted(set(changes) - set(live))
+        if pending:
+            logger.warning(f"Restart the kiosk to apply: {', '.join(pending)}")
+        if live:
+            self._assign({key: new for key, (_, new) in live.items()})
+            logger.info(
+                "Settings reloaded: "
+                + ", ".join(f"{key} {old!r} -> {new!r}" for key, (old, new) in live.items())
+            )
+        return live
+        
+    def _assign(self, values: Dict[str, Any]):
+        # Synchronous, so no coroutine sees a mix of old and new values
+        sections: Dict[str, Dict[str, Any]] = {}
+        for key, value in values.items():
+            section, name = key.split('.', 1)
+            sections.setdefault(section, {})[name] = value
+        self.settings.update(sections)
+        
+    async def _announce(self, change: ConfigChange):
+        try:
+            await self._notify(change)
+        except Exception as e:
+            if not change.settings:
+                logger.error(f"Applying config change failed: {e}")
+                return
+            logger.error(f"Applying new settings failed, rolling back: {e}")
+            self._assign({key: old for key, (old, _) in change.settings.items()})
+            rollback = ConfigChange(
+                settings={key: (new, old) for key, (old, new) in change.settings.items()}
+            )
+            try:
+                await self._notify(rollback)
+            except Exception as e:
+                logger.error(f"Rolling back settings failed: {e}")
+        
+    async def _notify(self, change: ConfigChange):
+        for callback in self._listeners:
+            result = callback(change)
+            if asyncio.iscoroutine(result):
+                await result
+        
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
\ No newline at end of file
@@ -0,0 +1,117 @@
+import glob
+import logging
+import os
+from dataclasses import dataclass, field
+from typing import Dict, FrozenSet, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Decode paths, cheapest first. Software decode handles everything.
+DECODER_PREFERENCE = ("v4l2m2m", "drm", "mmal", "software")
+
+# Stateful V4L2 memory-to-memory decoder (Pi 4 and earlier)
+V4L2M2M_DEVICES = ("bcm2835-codec-decode",)
+V4L2M2M_CODECS = frozenset({"h264", "mjpeg"})
+
+# Stateless HEVC decoder exported through DRM/V4L2 request (Pi 4 and Pi 5)
+DRM_DEVICES = ("rpivid", "rpi-hevc-dec")
+DRM_CODECS = frozenset({"hevc"})
+
+# Legacy firmware decoder used by VLC's MMAL plugin
+MMAL_CODECS = frozenset({"h264", "mpeg4"})
+MMAL_PLUGIN_GLOB = "/usr/lib/*/vlc/plugins/*/libmmal*_plugin.so"
+
+# ffprobe codec names and VLC fourccs for the same codec
+CODEC_ALIASES = {
+    "avc1": "h264",
+    "x264": "h264",
+    "h265": "hevc",
+    "hev1": "hevc",
+    "hvc1": "hevc",
+    "mp4v": "mpeg4",
+    "fmp4": "mpeg4",
+    "xvid": "mpeg4",
+    "mjpg": "mjpeg",
+}
+
+# libVLC options that pin each decode path, without the leading "--" or ":"
+VLC_DECODER_OPTIONS = {
+    "v4l2m2m": ["codec=avcodec", "avcodec-codec={codec}_v4l2m2m"],
+    "drm": ["codec=avcodec", "avcodec-hw=drm"],
+    "mmal": ["codec=mmal_codec,avcodec"],
+    "software": ["codec=avcodec", "avcodec-hw=none"],
+}
+
+
+def normalize_codec(codec: Optional[str]) -> Optional[str]:
+    """Map ffprobe names and VLC fourccs onto one codec name"""
+    if not codec:
+        return None
+    codec = codec.strip().lower()
+    return CODEC_ALIASES.get(codec, codec)
+
+
+@dataclass(frozen=True)
+class DecodeChoice:
+    """Decode path picked for one video and the VLC options that select it"""
+    path: str
+    options: Tuple[str, ...] = ()
+
+
+def _video4linux_names():
+    names = []
+    for name_file in glob.glob("/sys/class/video4linux/video*/name"):
+        try:
+            with open(name_file) as f:
+                names.append(f.read().strip())
+        except OSError:
+            continue
+    return names
+
+
+def probe_decoders() -> Dict[str, FrozenSet[str]]:
+    """Detect usable decode paths and the codecs each accelerates"""
+    available = {}
+    names = _video4linux_names()
+    
+    if any(device in name for name in names for device in V4L2M2M_DEVICES):
+        available["v4l2m2m"] = V4L2M2M_CODECS
+    if any(device in name for name in names for device in DRM_DEVICES):
+        available["drm"] = DRM_CODECS
+    if os.path.exists("/dev/vchiq") and glob.glob(MMAL_PLUGIN_GLOB):
+        available["mmal"] = MMAL_CODECS
+    
+    # Empty set: accepts every codec
+    available["software"] = frozenset()
+    return available
+
+
+@dataclass
+class DecoderSelector:
+    """Chooses the cheapest decode path for a codec from what the probe found"""
+    available: Dict[str, FrozenSet[str]] = field(default_factory=lambda: {"software": frozenset()})
+    forced: Optional[str] = None  # display.hw_decode when not "auto"
+        
+    def choose(self, codec: Optional[str]) -> DecodeChoice:
+        """Cheapest decode path for a codec; the player decides if the codec is unknown"""
+        codec = normalize_codec(codec)
+        if codec is None and not self.forced:
+            return DecodeChoice("default")
+        
+        path = self.forced or next(
+            (path for path in DECODER_PREFERENCE
+             if path in self.available and (path == "software" or codec in self.available[path])),
+            "software"
+        )
+        options = tuple(
+            option.format(codec=codec or "h264") for option in VLC_DECODER_OPTIONS[path]
+        )
+        return DecodeChoice(path, options)
+        
+    def describe(self) -> str:
+        parts = []
+        for path in DECODER_PREFERENCE:
+            if path in self.available:
+                codecs = self.available[path]
+                parts.append(f"{path}({', '.join(sorted(codecs))})" if codecs else path)
+        return ", ".join(parts)
\ No newline at end of file
@@ -4,6 +4,8 @@ import time
 from enum import Enum
 from pathlib import Path
 
+from media.media_handle import MediaHandle
+
 from .video_player import VideoPlayer
 from .slideshow import Slideshow
 
@@ -16,66 +18,296 @@ class DisplayMode(Enum):
     IDLE = "idle"
 
 
+class PlaybackState(Enum):
+    IDLE = "idle"
+    STARTING = "starting"
+    PLAYING = "playing"
+    ENDED = "ended"
+    FAILED = "failed"
+    PREEMPTED = "preempted"
+
+
+# Allowed playback state transitions
+PLAYBACK_TRANSITIONS = {
+    PlaybackState.IDLE: {PlaybackState.STARTING},
+    PlaybackState.STARTING: {PlaybackState.PLAYING, PlaybackState.FAILED, PlaybackState.PREEMPTED},
+    PlaybackState.PLAYING: {PlaybackState.ENDED, PlaybackState.FAILED, PlaybackState.PREEMPTED},
+    PlaybackState.ENDED: {PlaybackState.STARTING, PlaybackState.IDLE},
+    PlaybackState.FAILED: {PlaybackState.STARTING, PlaybackState.IDLE},
+    PlaybackState.PREEMPTED: {PlaybackState.STARTING, PlaybackState.IDLE},
+}
+
+# What a press does while another video is starting or playing:
+#   ignore  - keep the current video, drop the press
+#   restart - always start the pressed video, even if it is the one playing
+#   switch  - start the pressed video unless it is already the one playing
+#   queue   - play the pressed video after the current one (latest press wins)
+PREEMPTION_POLICIES = ("ignore", "restart", "switch", "queue")
+
+
+def _video_key(video) -> str:
+    return str(video.path if isinstance(video, MediaHandle) else video)
+
+
 class DisplayController:
-    def __init__(self, settings):
+    def __init__(self, settings, media_index=None, catalog=None, playlists=None):
         self.settings = settings
         self.current_mode = DisplayMode.IDLE
+        self.playback_state = PlaybackState.IDLE
         self.last_activity = time.time()
         
-        self.video_player = VideoPlayer(settings)
-        self.slideshow = Slideshow(settings)
+        self.video_player = VideoPlayer(settings, catalog)
+        self.slideshow = Slideshow(settings, media_index, catalog, playlists)
+        self.slideshow.on_video = self._play_from_playlist
+        
+        self._apply_settings()
         
-        self.idle_timeout = settings.display.idle_timeout
+        # Serializes every change of what is on screen
+        self._lock = asyncio.Lock()
+        
+        self._resume_timer = None
+        self._watch_task = None
+        self._start_task = None
+        self._playback_id = 0
+        
+        self._current_video = None  # key of the video starting or playing
+        self._pending = None  # (video, pressed_at_ns) waiting to be started
+        self._queued = None  # (video, pressed_at_ns) to play when the current one ends
+        
+    def _apply_settings(self):
+        # A video that makes no progress for this long is treated as stuck
+        self.stall_timeout = self.settings.display.video_stall_timeout
+        self.post_roll = self.settings.display.video_post_roll
+        
+        self.preemption_policy = self.settings.display.preemption_policy
+        if self.preemption_policy not in PREEMPTION_POLICIES:
+            logger.warning(f"Unknown preemption policy {self.preemption_policy!r}, using 'switch'")
+            self.preemption_policy = "switch"
+        
+    def on_config_change(self, change):
+        """Pick up display settings edited while running (config.watcher.ConfigChange)"""
+        if any(key.startswith('display.') for key in change.settings):
+            self._apply_settings()
+            self.slideshow.apply_settings()
         
     async def initialize(self):
         """Initialize display subsystems"""
         logger.info("Initializing display controller")
         
+        await self.initialize_display()
         await self.video_player.initialize()
-        await self.slideshow.initialize()
+        await self.slideshow.scan_images()
+        
+    async def initialize_display(self):
+        """Open the screen and show a first frame; the rest can follow concurrently"""
+        await self.slideshow.initialize_display()
+        
+    def _set_playback_state(self, state: PlaybackState):
+        """Move the playback state machine, rejecting impossible transitions"""
+        if state not in PLAYBACK_TRANSITIONS[self.playback_state]:
+            raise RuntimeError(
+                f"Invalid playback transition {self.playback_state.value} -> {state.value}"
+            )
+        logger.debug(f"Playback {self.playback_state.value} -> {state.value}")
+        self.playback_state = state
+        
+    @property
+    def video_busy(self) -> bool:
+        """True while a video is starting, playing or about to be started"""
+        return self._pending is not None or self.playback_state in (
+            PlaybackState.STARTING, PlaybackState.PLAYING
+        )
         
     async def start_slideshow(self):
         """Start the picture slideshow"""
+        async with self._lock:
+            await self._resume_slideshow()
+        
+    async def _resume_slideshow(self):
+        """Stop any video and show the slideshow; caller holds the lock"""
         logger.info("Starting slideshow mode")
+        self._cancel_resume_timer()
+        self._queued = None
         
         if self.current_mode == DisplayMode.VIDEO:
+            if self.playback_state in (PlaybackState.STARTING, PlaybackState.PLAYING):
+                self._set_playback_state(PlaybackState.PREEMPTED)
+            self._cancel_watch()
             await self.video_player.stop()
         
+        if self.playback_state != PlaybackState.IDLE:
+            self._set_playback_state(PlaybackState.IDLE)
+        
+        self._current_video = None
         self.current_mode = DisplayMode.SLIDESHOW
         await self.slideshow.start()
         
-    async def play_video(self, video_path):
-        """Play a specific video"""
-        logger.info(f"Playing video: {video_path}")
+    async def play_video(self, video_path, pressed_at_ns=None):
+        """Request a video, applying the preemption policy if one is already on"""
+        key = _video_key(video_path)
+        self.last_activity = time.time()
+        
+        if self.video_busy:
+            current = _video_key(self._pending[0]) if self._pending else self._current_video
+            policy = self.preemption_policy
+            
+            if policy == "ignore" or (policy == "switch" and key == current):
+                logger.info(f"Ignoring request for {key} while {current} is playing")
+                return
+            if policy == "queue":
+                logger.info(f"Queued {key} after {current}")
+                self._queued = (video_path, pressed_at_ns)
+                return
+        
+        logger.info(f"Playing video: {key}")
+        if self._pending:
+            logger.debug(f"Superseded request for {_video_key(self._pending[0])}")
+        self._pending = (video_path, pressed_at_ns)
+        
+        # A pending request also stops the watcher from resuming the slideshow
+        self._cancel_resume_timer()
         
+        if self._start_task is None or self._start_task.done():
+            self._start_task = asyncio.create_task(self._run_pending())
+        
+    async def _play_from_playlist(self, video_path) -> bool:
+        """Play a video the slideshow's playlist reached, unless a press got there first"""
+        if self.video_busy:
+            return False
+        await self.play_video(video_path)
+        return True
+        
+    async def _run_pending(self):
+        """Start the most recent request until no newer one is waiting"""
+        while self._pending:
+            async with self._lock:
+                request, self._pending = self._pending, None
+                if request:
+                    try:
+                        await self._start_video(*request)
+                    except Exception as e:
+                        # Nothing awaits this task, so this is the only report
+                        logger.error(f"Starting video failed: {e}")
+        
+    async def _start_video(self, video_path, pressed_at_ns):
+        """Switch from whatever is showing to a video; caller holds the lock"""
         if self.current_mode == DisplayMode.SLIDESHOW:
+            # The slideshow keeps its position and resumes on the same image
             await self.slideshow.stop()
         
+        self._cancel_resume_timer()
+        self._cancel_watch()
+        if self.playback_state in (PlaybackState.STARTING, PlaybackState.PLAYING):
+            self._set_playback_state(PlaybackState.PREEMPTED)
+        
+        self._set_playback_state(PlaybackState.STARTING)
         self.current_mode = DisplayMode.VIDEO
-        self.last_activity = time.time()
+        self._current_video = _video_key(video_path)
+        self._playback_id += 1
+        playback_id = self._playback_id
         
-        await self.video_player.play(video_path)
+        try:
+            started = await self.video_player.play(video_path, pressed_at_ns)
+        except Exception as e:
+            logger.error(f"Could not start {self._current_video}: {e}")
+            started = False
         
-        # Return to slideshow after video ends
-        asyncio.create_task(self._video_end_handler())
+        if not started:
+            self._set_playback_state(PlaybackState.FAILED)
+            await self._after_playback(linger=False)
+            return
         
-    async def _video_end_handler(self):
-        """Handle video playback completion"""
-        await self.video_player.wait_for_completion()
-        logger.info("Video playback completed")
-        self.last_activity = time.time()
+        self._set_playback_state(PlaybackState.PLAYING)
+        self._watch_task = asyncio.create_task(
+            self._watch_playback(playback_id, self.video_player.duration_of(video_path))
+        )
         
-    def should_return_to_slideshow(self):
-        """Check if idle timeout has been reached"""
-        if self.current_mode != DisplayMode.VIDEO:
-            return False
+    async def _watch_playback(self, playback_id, duration):
+        """Wait for the video to end, failing it if playback stops progressing"""
+        ended = asyncio.create_task(self.video_player.wait_for_completion())
+        started_at = time.monotonic()
+        last_position = None
+        stuck = False
+        failed = False
+        
+        try:
+            while True:
+                done, _ = await asyncio.wait({ended}, timeout=self.stall_timeout)
+                if done:
+                    failed = not ended.result()
+                    break
+                
+                # Watchdog: known duration overrun, or the position stopped moving
+                position = self.video_player.position_ms()
+                overran = duration is not None and time.monotonic() - started_at > duration + self.stall_timeout
+                stalled = position is not None and position == last_position
+                if overran or stalled:
+                    stuck = True
+                    break
+                last_position = position
+        finally:
+            ended.cancel()
+        
+        async with self._lock:
+            if playback_id != self._playback_id or self._pending:
+                # A newer request owns the screen
+                return
+            self._watch_task = None
+            self.last_activity = time.time()
             
-        time_since_activity = time.time() - self.last_activity
-        return time_since_activity > self.idle_timeout
+            if stuck:
+                logger.error("Video playback stuck, giving up on it")
+                self._set_playback_state(PlaybackState.FAILED)
+                await self.video_player.stop()
+            elif failed:
+                logger.error("Video playback failed")
+                self._set_playback_state(PlaybackState.FAILED)
+            else:
+                logger.info("Video playback completed")
+                self._set_playback_state(PlaybackState.ENDED)
+            await self._after_playback(linger=not (stuck or failed))
+        
+    async def _after_playback(self, linger):
+        """Play a queued video, or resume the slideshow now or after the post-roll"""
+        queued, self._queued = self._queued, None
+        if queued:
+            await self._start_video(*queued)
+        elif linger and self.post_roll > 0:
+            self._resume_timer = asyncio.get_running_loop().call_later(
+                self.post_roll, self._on_post_roll_done, self._playback_id
+            )
+        else:
+            await self._resume_slideshow()
+        
+    def _on_post_roll_done(self, playback_id):
+        self._resume_timer = None
+        asyncio.create_task(self._resume_if_current(playback_id))
+        
+    async def _resume_if_current(self, playback_id):
+        async with self._lock:
+            if playback_id == self._playback_id and not self._pending:
+                await self._resume_slideshow()
+        
+    def _cancel_resume_timer(self):
+        if self._resume_timer:
+            self._resume_timer.cancel()
+            self._resume_timer = None
+        
+    def _cancel_watch(self):
+        task, self._watch_task = self._watch_task, None
+        if task and task is not asyncio.current_task():
+            task.cancel()
         
     async def cleanup(self):
         """Clean up display resources"""
         logger.info("Cleaning up display controller")
+        self._pending = None
+        self._queued = None
+        self._cancel_resume_timer()
+        self._cancel_watch()
+        if self._start_task:
+            self._start_task.cancel()
+            self._start_task = None
         
         await self.video_player.cleanup()
         await self.slideshow.cleanup()
\ No newline at end of file
@@ -0,0 +1,238 @@
+import hashlib
+import logging
+import os
+import struct
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional, Tuple
+
+import pygame
+
+from media.image_ingest import derivative_name, load_display_image
+
+logger = logging.getLogger(__name__)
+
+# Raw frame file layout: magic, width, height, then width * height * 3 RGB bytes
+FRAME_MAGIC = b"WWF1"
+FRAME_HEADER = struct.Struct("<4sII")
+FRAME_SUFFIX = ".frame"
+
+# Pruning trims the disk cache to this fraction of its budget, so the next
+# few frames written do not each trigger another scan
+PRUNE_TARGET = 0.9
+
+
+def decode_frame(image_path, target_size: Tuple[int, int]) -> Tuple[Tuple[int, int], bytes]:
+    """Decode an image upright and scaled to fit target_size, returning raw RGB data"""
+    img = load_display_image(image_path, target_size)
+    return img.size, img.tobytes()
+
+
+class ImageCache:
+    """Screen-resolution slide frames, cached on disk and as surfaces in memory"""
+        
+    def __init__(self, settings, target_size: Tuple[int, int]):
+        self.settings = settings
+        self.target_size = tuple(target_size)
+        
+        self.cache_dir = Path(settings.media.cache_dir) / "frames"
+        self.derivatives_dir = Path(settings.media.cache_dir) / "derivatives"
+        
+        # Derivatives are written for the configured display; only use them
+        # when the actual screen is no larger
+        self.derivative_box = (settings.display.width, settings.display.height)
+        self.use_derivatives = (
+            self.target_size[0] <= self.derivative_box[0]
+            and self.target_size[1] <= self.derivative_box[1]
+        )
+        self.max_disk_bytes = settings.media.frame_cache_mb * 1024 * 1024
+        self.max_memory_bytes = settings.display.surface_cache_mb * 1024 * 1024
+        
+        # Frame bytes on disk as of the last prune plus what was written since
+        self._disk_bytes = 0
+        self._disk_lock = threading.Lock()
+        
+        self._surfaces = OrderedDict()
+        self._memory_bytes = 0
+        
+    def initialize(self):
+        """Create the cache directory and trim it to the disk budget"""
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            self.prune_disk(remove_partial=True)
+        except OSError as e:
+            logger.warning(f"Frame cache unavailable at {self.cache_dir}: {e}")
+        
+    def cache_key(self, image_path) -> str:
+        """Build a cache key from path, mtime, size and target resolution"""
+        stat = os.stat(image_path)
+        width, height = self.target_size
+        raw = f"{os.path.abspath(image_path)}|{stat.st_mtime_ns}|{stat.st_size}|{width}x{height}"
+        return hashlib.sha1(raw.encode()).hexdigest()
+        
+    def load_frame(self, image_path, key: Optional[str] = None) -> Tuple[str, Tuple[int, int], bytes]:
+        """Return (key, size, data) for an image, decoding it on a disk cache miss
+
+        Safe to call from worker threads; it never touches pygame or the memory LRU.
+        """
+        key = key or self.cache_key(image_path)
+        frame_file = self.cache_dir / f"{key}{FRAME_SUFFIX}"
+        
+        frame = self._read_frame(frame_file)
+        if frame is None:
+            frame = decode_frame(self._derivative_or_source(image_path), self.target_size)
+            self._write_frame(frame_file, *frame)
+        
+        return (key, *frame)
+        
+    def _derivative_or_source(self, image_path):
+        """Prefer the screen-sized derivative written by image ingestion"""
+        if self.use_derivatives:
+            try:
+                derivative = self.derivatives_dir / derivative_name(image_path, self.derivative_box)
+                if derivative.exists():
+                    return derivative
+            except OSError:
+                pass
+        return image_path
+        
+    def contains(self, key: str) -> bool:
+        """Check whether a decoded surface is held in memory"""
+        return key in self._surfaces
+        
+    def get_cached_surface(self, key: str) -> Optional[pygame.Surface]:
+        """Return a decoded surface from the memory LRU, if present"""
+        surface = self._surfaces.get(key)
+        if surface is not None:
+            self._surfaces.move_to_end(key)
+        return surface
+        
+    def make_surface(self, key: str, size: Tuple[int, int], data) -> pygame.Surface:
+        """Wrap raw frame data in a surface and remember it in the memory LRU
+
+        frombuffer shares the decoded buffer instead of copying it; the
+        surface keeps the buffer alive and slides are never drawn into.
+        """
+        surface = pygame.image.frombuffer(data, size, 'RGB')
+        self._remember(key, surface)
+        return surface
+        
+    def get_surface(self, image_path) -> pygame.Surface:
+        """Return a ready-to-blit surface for an image"""
+        surface = self.get_cached_surface(self.cache_key(image_path))
+        if surface is None:
+            surface = self.make_surface(*self.load_frame(image_path))
+        return surface
+        
+    def _remember(self, key: str, surface: pygame.Surface):
+        """Insert a surface into the LRU, evicting old entries over budget"""
+        if key in self._surfaces:
+            self._forget(key)
+        
+        self._surfaces[key] = surface
+        self._memory_bytes += self._surface_bytes(surface)
+        
+        # Always keep the newest surface, even if it alone exceeds the budget
+        while self._memory_bytes > self.max_memory_bytes and len(self._surfaces) > 1:
+            self._forget(next(iter(self._surfaces)))
+        
+    def _forget(self, key: str):
+        surface = self._surfaces.pop(key)
+        self._memory_bytes -= self._surface_bytes(surface)
+        
+    @staticmethod
+    def _surface_bytes(surface: pygame.Surface) -> int:
+        return surface.get_width() * surface.get_height() * surface.get_bytesize()
+        
+    def _read_frame(self, frame_file: Path) -> Optional[Tuple[Tuple[int, int], bytearray]]:
+        """Read a raw frame from disk, or None if missing or corrupt"""
+        try:
+            with open(frame_file, 'rb') as f:
+                magic, width, height = FRAME_HEADER.unpack(f.read(FRAME_HEADER.size))
+                expected = width * height * 3
+                valid = (
+                    magic == FRAME_MAGIC
+                    and os.fstat(f.fileno()).st_size == FRAME_HEADER.size + expected
+                )
+                if valid:
+                    # Read straight into the buffer the surface will wrap
+                    data = bytearray(expected)
+                    valid = f.readinto(data) == expected
+        except (OSError, struct.error):
+            return None
+        
+        if not valid:
+            logger.warning(f"Discarding corrupt frame cache entry: {frame_file.name}")
+            self._remove(frame_file)
+            return None
+        
+        return (width, height), data
+        
+    def _write_frame(self, frame_file: Path, size: Tuple[int, int], data: bytes):
+        """Write a raw frame to disk via a temp file so readers never see partial data"""
+        tmp_file = frame_file.with_suffix(f".{os.getpid()}.tmp")
+        try:
+            with open(tmp_file, 'wb') as f:
+                f.write(FRAME_HEADER.pack(FRAME_MAGIC, *size))
+                f.write(data)
+            os.replace(tmp_file, frame_file)
+        except OSError as e:
+            logger.warning(f"Failed to cache frame {frame_file.name}: {e}")
+            self._remove(tmp_file)
+            return
+        
+        with self._disk_lock:
+            self._disk_bytes += FRAME_HEADER.size + len(data)
+            if self._disk_bytes <= self.max_disk_bytes:
+                return
+            try:
+                self.prune_disk()
+            except OSError as e:
+                logger.warning(f"Failed to prune slide cache: {e}")
+        
+    def prune_disk(self, remove_partial: bool = False):
+        """Delete the oldest frame files once the cache exceeds its disk budget
+
+        remove_partial also deletes temp files; only safe while nothing writes.
+        """
+        entries = []
+        total = 0
+        
+        with os.scandir(self.cache_dir) as it:
+            for entry in it:
+                if not entry.is_file():
+                    continue
+                if entry.name.endswith(".tmp"):
+                    if remove_partial:
+                        self._remove(Path(entry.path))
+                    continue
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+        
+        if total > self.max_disk_bytes:
+            target = self.max_disk_bytes * PRUNE_TARGET
+            entries.sort()
+            removed = 0
+            for _, size, path in entries:
+                if total <= target:
+                    break
+                self._remove(Path(path))
+                total -= size
+                removed += 1
+            logger.info(f"Pruned {removed} frames from slide cache")
+        
+        self._disk_bytes = total
+        
+    @staticmethod
+    def _remove(path: Path):
+        try:
+            path.unlink()
+        except OSError:
+            pass
+        
+    def clear_memory(self):
+        """Drop all decoded surfaces"""
+        self._surfaces.clear()
+        self._memory_bytes = 0
\ No newline at end of file
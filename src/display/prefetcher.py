@@ -0,0 +1,81 @@
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable
+
+import pygame
+
+from .image_cache import ImageCache
+
+logger = logging.getLogger(__name__)
+
+
+class SlidePrefetcher:
+    """Decodes upcoming slides in a worker pool while the current one is shown"""
+        
+    def __init__(self, settings, image_cache: ImageCache):
+        self.settings = settings
+        self.image_cache = image_cache
+        
+        self.depth = max(0, settings.display.prefetch_depth)
+        self.executor = ThreadPoolExecutor(
+            max_workers=max(1, settings.display.prefetch_workers),
+            thread_name_prefix="slide-prefetch"
+        )
+        
+        # image path -> future resolving to (key, size, data)
+        self._pending = {}
+        
+    def prefetch(self, paths: Iterable):
+        """Start decoding the given upcoming images, dropping stale requests"""
+        wanted = []
+        for path in paths:
+            if len(wanted) >= self.depth:
+                break
+            if path not in wanted:
+                wanted.append(path)
+        
+        for path in list(self._pending):
+            if path not in wanted:
+                # Only cancels work that has not started yet
+                self._pending.pop(path).cancel()
+        
+        for path in wanted:
+            if path not in self._pending:
+                self._pending[path] = self._submit(path)
+        
+    async def get_surface(self, image_path) -> pygame.Surface:
+        """Return a surface for an image, waiting on its prefetch if needed"""
+        future = self._pending.pop(image_path, None)
+        if future is None or future.cancelled():
+            future = self._submit(image_path)
+        
+        key, size, data = await future
+        
+        surface = self.image_cache.get_cached_surface(key)
+        if surface is None:
+            if data is None:
+                # Evicted from memory between the worker check and now
+                key, size, data = await self._submit(image_path, key)
+            surface = self.image_cache.make_surface(key, size, data)
+        return surface
+        
+    def _submit(self, image_path, key=None) -> asyncio.Future:
+        loop = asyncio.get_running_loop()
+        if key:
+            return loop.run_in_executor(self.executor, self.image_cache.load_frame, image_path, key)
+        return loop.run_in_executor(self.executor, self._load, image_path)
+        
+    def _load(self, image_path):
+        """Worker: skip the disk read entirely when the surface is already in memory"""
+        key = self.image_cache.cache_key(image_path)
+        if self.image_cache.contains(key):
+            return key, None, None
+        return self.image_cache.load_frame(image_path, key)
+        
+    def shutdown(self):
+        """Cancel outstanding work and stop the worker pool"""
+        for future in self._pending.values():
+            future.cancel()
+        self._pending.clear()
+        self.executor.shutdown(wait=False, cancel_futures=True)
\ No newline at end of file
@@ -1,21 +1,54 @@
 import asyncio
 import logging
 import random
-from pathlib import Path
-from typing import List
+from typing import List, Optional
 
 import pygame
-from PIL import Image
+
+from media.media_index import PICTURE_EXTENSIONS, MediaChange, scan_directory
+from media.path_table import PathTable
+from media.permutation import FeistelPermutation
+from media.playlist_engine import PlaylistItem
+
+from .image_cache import ImageCache
+from .prefetcher import SlidePrefetcher
+from .transitions import CrossFade
 
 logger = logging.getLogger(__name__)
 
 
 class Slideshow:
-    def __init__(self, settings):
+    def __init__(self, settings, media_index=None, catalog=None, playlists=None):
         self.settings = settings
         self.running = False
-        self.current_image_index = 0
-        self.images = []
+        
+        # Sorted, packed image paths; with shuffle on, a permutation maps
+        # rotation positions to table indices instead of a shuffled copy
+        self.images = PathTable()
+        self.current_image_index = 0  # position in the rotation
+        self._order = None
+        self._seed = None
+        
+        # Shared media index; new uploads are merged in as they arrive
+        self.media_index = media_index
+        if media_index:
+            media_index.subscribe(self._on_media_change)
+        self._waiting_for_images = False
+        self.catalog = catalog
+        
+        # While a playlist (media.playlist_engine.PlaylistEngine) is active it
+        # decides what is shown; otherwise the whole library rotates
+        self.playlists = playlists
+        self._playlist = None
+        self._cursor = None
+        
+        # coroutine(path) -> bool, set by the display controller: plays a
+        # playlist video, False if it could not be started now
+        self.on_video = None
+        
+        self._task = None
+        self._advance = asyncio.Event()
+        self._repaint = False
         
         self.interval = settings.display.slideshow_interval
         self.transition_duration = settings.display.transition_duration
@@ -23,9 +56,31 @@ class Slideshow:
         
         self.screen = None
         self.clock = None
+        self.image_cache = None
+        self.prefetcher = None
+        self.transition = None
+        
+        # Two full-screen buffers, swapped per slide: the front one matches the
+        # screen, the incoming slide is composed into the back one. Each buffer
+        # is cleared to black once; after that only the old image rect is
+        # cleared, so letterbox bars are never redrawn.
+        self._buffers = [None, None]
+        self._buffer_rects = [None, None]
+        self._front = 0
+        self._shown_rect = None  # None: screen contents unknown, repaint it all
+        
+        # Set once a slide, or the no-images screen, has reached the display
+        self.content_shown = asyncio.Event()
         
     async def initialize(self):
         """Initialize slideshow display"""
+        await self.initialize_display()
+        
+        # Load image list
+        await self.scan_images()
+        
+    async def initialize_display(self):
+        """Open the display and put a first frame up, before any media is known"""
         logger.info("Initializing slideshow")
         
         # Initialize pygame
@@ -42,49 +97,152 @@ class Slideshow:
         pygame.display.set_caption("WW2 Kiosk")
         self.clock = pygame.time.Clock()
         
-        # Load image list
-        await self.scan_images()
+        # Pre-scaled frames are cached at the actual screen resolution
+        self.image_cache = ImageCache(self.settings, self.screen.get_size())
+        self.image_cache.initialize()
+        self.prefetcher = SlidePrefetcher(self.settings, self.image_cache)
+        self.transition = CrossFade(
+            self.screen, self.clock,
+            self.transition_duration, self.settings.display.transition_fps
+        )
+        
+        self._show_message("WW2 Kiosk")
+        
+    def apply_settings(self):
+        """Pick up slideshow settings edited while running; the next slide uses them"""
+        display = self.settings.display
+        self.interval = display.slideshow_interval
+        self.transition_duration = display.transition_duration
+        
+        if self.screen is not None:
+            # A fade in progress finishes with the old one
+            self.transition = CrossFade(
+                self.screen, self.clock, self.transition_duration, display.transition_fps
+            )
+        
+        if display.shuffle_slideshow != self.shuffle:
+            current = self._image_at(self.current_image_index) if self.images else None
+            self.shuffle = display.shuffle_slideshow
+            self._reshuffle()
+            if current is not None:
+                index = self.images.find(current)
+                self.current_image_index = self._order.position_of(index) if self._order else index
         
     async def scan_images(self):
         """Scan for available images"""
-        image_dir = Path(self.settings.media.pictures_dir)
+        if self.catalog:
+            # Skips files the catalog already found to be undecodable
+            paths = self.catalog.iter_files('pictures')
+        elif self.media_index:
+            paths = self.media_index.files('pictures')
+        else:
+            image_dir = self.settings.media.pictures_dir
+            paths = sorted(scan_directory(image_dir, PICTURE_EXTENSIONS))
+        # The catalog streams rows straight into the packed table
+        self.images = PathTable(paths)
+        self.current_image_index = 0
+        self._reshuffle()
+            
+        logger.info(f"Found {len(self.images)} images")
         
-        if not image_dir.exists():
-            logger.warning(f"Pictures directory not found: {image_dir}")
+    def _reshuffle(self, seed=None):
+        """Pick a new rotation order; the same seed gives the same order for a size"""
+        if not self.shuffle:
+            self._order = None
             return
+        self._seed = random.getrandbits(64) if seed is None else seed
+        self._order = FeistelPermutation(len(self.images), self._seed)
+        
+    def _image_at(self, position: int) -> str:
+        """Image shown at a position of the rotation"""
+        index = self._order[position] if self._order else position
+        return self.images[index]
+        
+    def _on_media_change(self, change: MediaChange):
+        """Merge picture additions and removals without disturbing the current slide"""
+        if self._cursor and self._cursor.exhausted and not self._cursor.peek(1):
+            # Give a playlist that had nothing available another chance
+            self._playlist = self._cursor = None
             
-        self.images = []
-        for ext in ['*.jpg', '*.jpeg', '*.png', '*.bmp']:
-            self.images.extend(image_dir.glob(ext))
-            self.images.extend(image_dir.glob(ext.upper()))
+        if change.kind != 'pictures':
+            return
             
-        logger.info(f"Found {len(self.images)} images")
+        current = self._image_at(self.current_image_index) if self.images else None
+        self.images = self.images.merged(change.added, change.removed)
+        # Same seed, new size: the order changes, but stays a single shuffle
+        self._reshuffle(self._seed)
         
-        if self.shuffle:
-            random.shuffle(self.images)
+        if not self.images:
+            self.current_image_index = 0
+        elif current is not None and (index := self.images.find(current)) >= 0:
+            # Continue the rotation from the slide on screen
+            self.current_image_index = self._order.position_of(index) if self._order else index
+        elif current is None or self._order:
+            self.current_image_index %= len(self.images)
+        else:
+            # The current slide was deleted; carry on from where it was
+            self.current_image_index = self.images.insertion_point(current) % len(self.images)
+            
+        if self._waiting_for_images and self.images:
+            logger.info("Images arrived, starting slideshow")
+            asyncio.create_task(self.start())
             
     async def start(self):
         """Start the slideshow"""
-        if not self.images:
+        if self._current_item() is None:
             logger.warning("No images available for slideshow")
+            self._waiting_for_images = True
             await self.show_default_screen()
             return
             
+        self._waiting_for_images = False
+        if self.running:
+            return
+            
         self.running = True
-        asyncio.create_task(self._slideshow_loop())
+        # Whatever covered the screen is gone; show the current slide straight away
+        self._repaint = True
+        self._shown_rect = None
+        self._task = asyncio.create_task(self._slideshow_loop())
+        
+    def advance(self):
+        """Show the next slide now rather than at the end of the interval"""
+        self._advance.set()
         
     async def _slideshow_loop(self):
         """Main slideshow loop"""
         while self.running:
+            item = self._current_item()
+            if item is None:
+                # Everything was deleted; wait for new uploads
+                self.running = False
+                await self.start()
+                break
+                
             try:
-                # Display current image
-                await self.display_image(self.images[self.current_image_index])
+                if item.kind == 'videos':
+                    if self.on_video and await self.on_video(item.path):
+                        # The display controller stops the slideshow and resumes it afterwards
+                        self._next_position()
+                        self.running = False
+                        break
+                    # Not playable now; the current slide stays up for its place instead
+                else:
+                    # Display current image
+                    await self.display_image(item.path, transition=not self._repaint)
+                    self._repaint = False
+                    
+                    # Decode the next slides while this one is on screen
+                    self.prefetcher.prefetch(self._upcoming_images())
                 
-                # Wait for interval
-                await asyncio.sleep(self.interval)
+                # Sleep until the next slide is due or an advance is requested
+                self._advance.clear()
+                try:
+                    await asyncio.wait_for(self._advance.wait(), timeout=item.duration or self.interval)
+                except asyncio.TimeoutError:
+                    pass
                 
-                # Move to next image
-                self.current_image_index = (self.current_image_index + 1) % len(self.images)
+                self._next_position()
                 
                 # Handle pygame events
                 for event in pygame.event.get():
@@ -95,56 +253,134 @@ class Slideshow:
                 logger.error(f"Error in slideshow loop: {e}")
                 await asyncio.sleep(1)
                 
-    async def display_image(self, image_path):
-        """Display a single image"""
-        try:
-            # Load and scale image
-            img = Image.open(image_path)
+    def _current_item(self) -> Optional[PlaylistItem]:
+        """What to show now: the active playlist's current item, else the library's"""
+        playlist = self.playlists.active_playlist() if self.playlists else None
+        if playlist is not self._playlist:
+            # Schedule boundary, or the playlists were edited
+            if playlist:
+                logger.info(f"Playing playlist {playlist.name}")
+            elif self._playlist:
+                logger.info("No playlist active, showing all pictures")
+            self._playlist = playlist
+            self._cursor = self.playlists.cursor(playlist) if playlist else None
             
-            # Convert to RGB if necessary
-            if img.mode != 'RGB':
-                img = img.convert('RGB')
-                
-            # Scale to fit screen while maintaining aspect ratio
-            screen_size = self.screen.get_size()
-            img.thumbnail(screen_size, Image.Resampling.LANCZOS)
+        item = self._cursor.current if self._cursor else None
+        if item is None and self.images:
+            item = PlaylistItem(self._image_at(self.current_image_index), 'pictures')
+        return item
+        
+    def _next_position(self):
+        if self._cursor and self._cursor.current is not None:
+            self._cursor.advance()
+            return
+        # Each pass through the library gets a new order
+        self.current_image_index = (self.current_image_index + 1) % len(self.images)
+        if self.current_image_index == 0:
+            self._reshuffle()
             
-            # Convert to pygame surface
-            img_surface = pygame.image.fromstring(
-                img.tobytes(), img.size, img.mode
-            )
+    def _upcoming_images(self):
+        """Images following the current one, in display order"""
+        if self._cursor and self._cursor.current is not None:
+            # Resolves only as far ahead as the prefetcher looks
+            for item in self._cursor.peek(self.prefetcher.depth + 1)[1:]:
+                if item.kind == 'pictures':
+                    yield item.path
+            return
+            
+        count = len(self.images)
+        for offset in range(1, min(self.prefetcher.depth, count - 1) + 1):
+            position = self.current_image_index + offset
+            if position >= count and self.shuffle:
+                # The next pass is reshuffled; don't prefetch from this order
+                break
+            yield self._image_at(position % count)
+            
+    async def display_image(self, image_path, transition=True):
+        """Display a single image, cross-fading from the previous one"""
+        try:
+            # Decoding and scaling run in the prefetch pool, off the event loop
+            img_surface = await self.prefetcher.get_surface(image_path)
+            screen_size = self.screen.get_size()
             
             # Center image on screen
-            x = (screen_size[0] - img.size[0]) // 2
-            y = (screen_size[1] - img.size[1]) // 2
+            x = (screen_size[0] - img_surface.get_width()) // 2
+            y = (screen_size[1] - img_surface.get_height()) // 2
+            image_rect = pygame.Rect((x, y), img_surface.get_size())
             
-            # Clear screen and display image
-            self.screen.fill((0, 0, 0))
-            self.screen.blit(img_surface, (x, y))
-            pygame.display.flip()
+            frame = self._compose_frame(img_surface, image_rect)
+            
+            if self._shown_rect is None:
+                # Unknown screen contents: one full repaint
+                self.screen.blit(frame, (0, 0))
+                pygame.display.flip()
+            else:
+                # Only the union of both images changes; letterbox bars stay black
+                area = image_rect.union(self._shown_rect)
+                if transition:
+                    old_frame = self._buffers[self._front]
+                    await self.transition.run(old_frame, frame, area, lambda: self.running)
+                else:
+                    self.screen.blit(frame, area, area)
+                    pygame.display.update(area)
+                
+            self._front = 1 - self._front
+            self._shown_rect = image_rect
+            self.content_shown.set()
             
         except Exception as e:
             logger.error(f"Failed to display image {image_path}: {e}")
             
+    def _compose_frame(self, img_surface, image_rect):
+        """Render a slide into the back buffer, clearing only the previous image"""
+        back = 1 - self._front
+        buffer = self._buffers[back]
+        if buffer is None:
+            buffer = pygame.Surface(self.screen.get_size()).convert()
+            buffer.fill((0, 0, 0))
+            self._buffers[back] = buffer
+        elif self._buffer_rects[back] is not None:
+            buffer.fill((0, 0, 0), self._buffer_rects[back])
+            
+        buffer.blit(img_surface, image_rect)
+        self._buffer_rects[back] = image_rect
+        return buffer
+        
     async def show_default_screen(self):
         """Show default screen when no images available"""
+        self._show_message("WW2 Kiosk - No Images Available")
+        self.content_shown.set()
+        
+    def _show_message(self, message: str):
+        """Fill the screen with a centred line of text"""
         self.screen.fill((0, 0, 0))
         
         # Display message
         font = pygame.font.Font(None, 48)
-        text = font.render("WW2 Kiosk - No Images Available", True, (255, 255, 255))
+        text = font.render(message, True, (255, 255, 255))
         text_rect = text.get_rect(center=(self.screen.get_width() // 2, 
                                          self.screen.get_height() // 2))
         self.screen.blit(text, text_rect)
         pygame.display.flip()
+        self._shown_rect = None
         
     async def stop(self):
         """Stop the slideshow"""
         self.running = False
-        await asyncio.sleep(0.1)  # Allow loop to exit
+        self._waiting_for_images = False
+        
+        task, self._task = self._task, None
+        if task and task is not asyncio.current_task():
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
         
     async def cleanup(self):
         """Clean up slideshow resources"""
         await self.stop()
+        if self.prefetcher:
+            self.prefetcher.shutdown()
         if pygame.display.get_init():
             pygame.quit()
\ No newline at end of file
@@ -0,0 +1,76 @@
+import asyncio
+import logging
+import time
+from typing import Callable, Optional
+
+import pygame
+
+logger = logging.getLogger(__name__)
+
+
+class CrossFade:
+    """Time-based alpha cross-fade between two screen-sized frames
+
+    Blending uses SDL's per-surface alpha blit, which is SIMD-accelerated and
+    avoids per-frame NumPy array round trips. Alpha is derived from elapsed
+    time rather than frame count, so a busy CPU drops frames instead of
+    stretching the transition.
+    """
+        
+    def __init__(self, screen: pygame.Surface, clock: pygame.time.Clock,
+                 duration: float, fps: int):
+        self.screen = screen
+        self.clock = clock
+        self.duration = max(0.0, float(duration))
+        self.frame_time = 1.0 / max(1, fps)
+        
+        self.frames_drawn = 0
+        self.frames_dropped = 0
+        
+    async def run(self, old_frame: pygame.Surface, new_frame: pygame.Surface,
+                  area: Optional[pygame.Rect] = None,
+                  keep_running: Callable[[], bool] = lambda: True):
+        """Fade from old_frame to new_frame, touching only the given screen area"""
+        area = area or self.screen.get_rect()
+        self.frames_drawn = 0
+        self.frames_dropped = 0
+        
+        try:
+            if self.duration > 0:
+                await self._fade(old_frame, new_frame, area, keep_running)
+        finally:
+            # The frame is a reused buffer; a fade cancelled midway must not
+            # leave it translucent for the next slide
+            new_frame.set_alpha(None)
+        
+        # Always land exactly on the new frame
+        self.screen.blit(new_frame, area, area)
+        pygame.display.update(area)
+        
+        if self.frames_dropped:
+            logger.debug(f"Cross-fade drew {self.frames_drawn} frames, dropped {self.frames_dropped}")
+        
+    async def _fade(self, old_frame, new_frame, area, keep_running):
+        start = time.monotonic()
+        last_index = -1
+        
+        while keep_running():
+            elapsed = time.monotonic() - start
+            if elapsed >= self.duration:
+                break
+            
+            # Skip any frame slots we missed while the CPU was busy
+            index = int(elapsed / self.frame_time)
+            self.frames_dropped += max(0, index - last_index - 1)
+            last_index = index
+            
+            new_frame.set_alpha(int(255 * elapsed / self.duration))
+            self.screen.blit(old_frame, area, area)
+            self.screen.blit(new_frame, area, area)
+            pygame.display.update(area)
+            self.clock.tick()
+            self.frames_drawn += 1
+            
+            # Sleep until the next frame slot, always yielding to other coroutines
+            next_frame_at = start + (index + 1) * self.frame_time
+            await asyncio.sleep(max(0.0, next_frame_at - time.monotonic()))
\ No newline at end of file
@@ -0,0 +1,383 @@
+import asyncio
+import logging
+import time
+from pathlib import Path
+from typing import Optional
+
+from media.media_handle import MediaHandle
+from monitoring.metrics import FrameStats, LatencyStats
+
+from .decoders import DecodeChoice
+
+logger = logging.getLogger(__name__)
+
+try:
+    import vlc
+    VLC_AVAILABLE = True
+except (ImportError, OSError):
+    # python-vlc raises OSError when libvlc itself is missing
+    logger.warning("python-vlc not available, libVLC backend disabled")
+    VLC_AVAILABLE = False
+
+
+class SubprocessBackend:
+    """Spawns a fresh player process for every video"""
+    
+    name = "subprocess"
+        
+    def __init__(self, settings):
+        self.settings = settings
+        self.current_process = None
+        self.is_playing = False
+        
+        self.player_cmd = settings.display.video_player or "vlc"
+        self.stop_timeout = settings.display.video_stop_timeout
+        
+        # Only process spawn is observable, not the first decoded frame or
+        # frame counters, so self.frames stays empty for this backend
+        self.latency = LatencyStats("Press-to-spawn latency")
+        self.frames = FrameStats("Playback frames")
+        
+    async def initialize(self):
+        """Check that the player binary is available, without blocking the loop"""
+        process = None
+        try:
+            process = await asyncio.create_subprocess_exec(
+                self.player_cmd, "--version",
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.DEVNULL
+            )
+            stdout, _ = await asyncio.wait_for(process.communicate(), timeout=5)
+            logger.debug(f"Video player version: {stdout.decode(errors='replace')[:100]}")
+        except Exception as e:
+            if process and process.returncode is None:
+                process.kill()
+            logger.error(f"Video player not available: {e!r}")
+            raise
+        
+    async def prepare(self, video_path) -> MediaHandle:
+        """Nothing to warm up; each play starts a new process"""
+        return MediaHandle(path=str(Path(video_path).resolve()))
+        
+    def release(self, handle: MediaHandle):
+        """Nothing to release for subprocess playback"""
+        
+    def _build_command(self, video_file: Path, decoder: Optional[DecodeChoice] = None):
+        """Build command line based on player"""
+        if self.player_cmd == "vlc":
+            decode_args = [f"--{option}" for option in decoder.options] if decoder else []
+            return [
+                "vlc",
+                "--fullscreen",
+                "--play-and-exit",
+                "--no-video-title-show",
+                "--quiet",
+                *decode_args,
+                str(video_file)
+            ]
+        elif self.player_cmd == "omxplayer":
+            return [
+                "omxplayer",
+                "-b",  # Blank background
+                "-o", "hdmi",  # Audio output
+                str(video_file)
+            ]
+        return [self.player_cmd, str(video_file)]
+        
+    async def play(self, video_file: Path, pressed_at_ns: Optional[int] = None,
+                   handle: Optional[MediaHandle] = None,
+                   decoder: Optional[DecodeChoice] = None) -> bool:
+        """Start a player process for the video"""
+        pressed_at_ns = pressed_at_ns or time.monotonic_ns()
+        cmd = self._build_command(video_file, decoder)
+        logger.info(f"Starting video playback: {' '.join(cmd)}")
+        
+        try:
+            self.current_process = await asyncio.create_subprocess_exec(
+                *cmd,
+                stdout=asyncio.subprocess.DEVNULL,
+                stderr=asyncio.subprocess.DEVNULL
+            )
+            self.is_playing = True
+            self.latency.record_ns(pressed_at_ns, time.monotonic_ns())
+            return True
+        
+        except Exception as e:
+            logger.error(f"Failed to start video playback: {e}")
+            return False
+        
+    async def stop(self):
+        """Terminate the current player process"""
+        process = self.current_process
+        if process and self.is_playing:
+            logger.info("Stopping video playback")
+            # Clear first so a concurrent wait_for_completion sees this as a stop
+            self.current_process = None
+            self.is_playing = False
+            
+            try:
+                if process.returncode is None:
+                    process.terminate()
+                    # Short grace period; a press should not wait on a slow exit
+                    await asyncio.wait_for(process.wait(), timeout=self.stop_timeout)
+            except asyncio.TimeoutError:
+                logger.warning("Video player didn't terminate, forcing kill")
+                process.kill()
+                await process.wait()
+            except ProcessLookupError:
+                pass
+            except Exception as e:
+                logger.error(f"Error stopping video: {e}")
+        
+    def position_ms(self) -> Optional[int]:
+        """A separate process cannot report its position"""
+        return None
+        
+    async def wait_for_completion(self) -> bool:
+        """Wait for the player process to exit; False if it exited with an error"""
+        process = self.current_process
+        if process:
+            returncode = await process.wait()
+            if self.current_process is process:
+                self.is_playing = False
+                self.current_process = None
+                return returncode == 0
+        return True
+        
+    async def cleanup(self):
+        await self.stop()
+
+
+class LibVLCBackend:
+    """Keeps one libVLC instance and media player alive for the whole session"""
+    
+    name = "libvlc"
+    
+    VLC_ARGS = [
+        "--no-video-title-show",
+        "--quiet",
+        "--no-osd",
+    ]
+    
+    PARSE_TIMEOUT_MS = 5000
+        
+    def __init__(self, settings):
+        self.settings = settings
+        self.is_playing = False
+        
+        self.instance = None
+        self.player = None
+        self.media = {}  # absolute path -> vlc.Media
+        self.media_decoders = {}  # absolute path -> decode path its options select
+        
+        self._loop = None
+        self._ended = None
+        self._failed = False  # the current video ended on a playback error
+        self._pressed_at_ns = None
+        self._current = None  # (path, decode path, vlc.Media) being played
+        
+        self.latency = LatencyStats("Press-to-first-frame latency")
+        self.frames = FrameStats("Playback frames")
+        
+    async def initialize(self):
+        """Create the long-lived libVLC instance and media player"""
+        self._loop = asyncio.get_running_loop()
+        
+        # Loading the plugin cache takes a while on a cold SD card
+        self.instance = await self._loop.run_in_executor(None, vlc.Instance, self.VLC_ARGS)
+        if self.instance is None:
+            raise RuntimeError("libVLC failed to initialize")
+        
+        self.player = self.instance.media_player_new()
+        self.player.set_fullscreen(True)
+        
+        # libVLC invokes these from its own threads; hop back onto the loop
+        events = self.player.event_manager()
+        events.event_attach(vlc.EventType.MediaPlayerVout, self._on_vlc_event, self._on_first_frame)
+        events.event_attach(vlc.EventType.MediaPlayerEndReached, self._on_vlc_event, self._on_ended)
+        events.event_attach(vlc.EventType.MediaPlayerEncounteredError, self._on_vlc_event, self._on_error)
+        
+        logger.info(f"libVLC {vlc.libvlc_get_version().decode()} ready")
+        
+    def _on_vlc_event(self, event, handler):
+        self._loop.call_soon_threadsafe(handler)
+        
+    def _on_first_frame(self):
+        if self._pressed_at_ns is not None:
+            self.latency.record_ns(self._pressed_at_ns, time.monotonic_ns())
+            self._pressed_at_ns = None
+        
+    def _on_ended(self):
+        self._report_frames()
+        self.is_playing = False
+        if self._ended:
+            self._ended.set()
+        
+    def _on_error(self):
+        logger.error(f"libVLC could not play {self._current[0] if self._current else 'the video'}")
+        self._failed = True
+        self._on_ended()
+        
+    async def prepare(self, video_path) -> MediaHandle:
+        """Create and pre-parse a media object so a press only has to start playback"""
+        media = self._get_media(video_path)
+        handle = MediaHandle(path=str(Path(video_path).resolve()), native=media)
+        
+        if media.get_parsed_status() != vlc.MediaParsedStatus.done:
+            parsed = self._loop.create_future()
+            
+            def on_parsed(event):
+                self._loop.call_soon_threadsafe(
+                    lambda: parsed.done() or parsed.set_result(None)
+                )
+                
+            events = media.event_manager()
+            events.event_attach(vlc.EventType.MediaParsedChanged, on_parsed)
+            try:
+                # Probes the container and streams without starting a decoder
+                media.parse_with_options(vlc.MediaParseFlag.local, self.PARSE_TIMEOUT_MS)
+                await asyncio.wait_for(parsed, self.PARSE_TIMEOUT_MS / 1000 + 1)
+            except asyncio.TimeoutError:
+                logger.warning(f"Timed out parsing {video_path}")
+            finally:
+                events.event_detach(vlc.EventType.MediaParsedChanged)
+                
+        if media.get_parsed_status() == vlc.MediaParsedStatus.done:
+            self._fill_track_info(handle, media)
+            
+        return handle
+        
+    @staticmethod
+    def _fill_track_info(handle: MediaHandle, media):
+        """Copy duration, codec and resolution of the first video track"""
+        handle.parsed = True
+        handle.duration_ms = media.get_duration() if media.get_duration() > 0 else None
+        
+        try:
+            for track in media.tracks_get() or ():
+                if track.type == vlc.TrackType.video:
+                    handle.codec = track.codec.to_bytes(4, 'little').decode('ascii', 'replace').strip()
+                    handle.width = track.video.contents.width
+                    handle.height = track.video.contents.height
+                    break
+        except Exception as e:
+            logger.debug(f"Could not read tracks for {handle.path}: {e}")
+            
+    def release(self, handle: MediaHandle):
+        """Drop a prepared media object that is no longer mapped"""
+        self.media_decoders.pop(handle.path, None)
+        media = self.media.pop(handle.path, None)
+        if media is not None:
+            media.release()
+            
+    def _get_media(self, video_path):
+        key = str(Path(video_path).resolve())
+        media = self.media.get(key)
+        if media is None:
+            media = self.instance.media_new_path(key)
+            self.media[key] = media
+        return media
+        
+    def _apply_decoder(self, video_file: Path, media, decoder: DecodeChoice):
+        """Pin a media object to a decode path; options cannot be removed once added"""
+        key = str(Path(video_file).resolve())
+        applied = self.media_decoders.get(key)
+        if applied == decoder.path:
+            return media
+        
+        if applied is not None:
+            # Chosen path changed, e.g. the catalog learned the codec; start fresh
+            self.media.pop(key, None)
+            media.release()
+            media = self._get_media(key)
+        
+        for option in decoder.options:
+            media.add_option(f":{option}")
+        self.media_decoders[key] = decoder.path
+        return media
+        
+    def _report_frames(self):
+        """Log displayed and dropped frames for the playback that just finished"""
+        current, self._current = self._current, None
+        if current is None:
+            return
+        
+        path, decoder, media = current
+        try:
+            stats = vlc.MediaStats()
+            if media.get_stats(stats):
+                self.frames.record(
+                    Path(path).name, decoder, stats.displayed_pictures, stats.lost_pictures
+                )
+        except Exception as e:
+            logger.debug(f"Could not read playback stats for {path}: {e}")
+            
+    async def play(self, video_file: Path, pressed_at_ns: Optional[int] = None,
+                   handle: Optional[MediaHandle] = None,
+                   decoder: Optional[DecodeChoice] = None) -> bool:
+        """Switch the persistent player to a video and start it"""
+        media = handle.native if handle and handle.native else self._get_media(video_file)
+        if decoder:
+            media = self._apply_decoder(video_file, media, decoder)
+            if handle:
+                handle.native = media
+        
+        self._ended = asyncio.Event()
+        self._failed = False
+        self._pressed_at_ns = pressed_at_ns or time.monotonic_ns()
+        
+        self.player.set_media(media)
+        if self.player.play() == -1:
+            logger.error(f"libVLC failed to start {video_file}")
+            self._pressed_at_ns = None
+            self._ended.set()
+            return False
+        
+        logger.info(
+            f"Starting video playback: {video_file}"
+            + (f" ({decoder.path} decode)" if decoder else "")
+        )
+        self.is_playing = True
+        self._current = (str(video_file), decoder.path if decoder else "default", media)
+        return True
+        
+    async def stop(self):
+        """Stop playback, keeping the player alive for the next video"""
+        if self.player and self.is_playing:
+            logger.info("Stopping video playback")
+            # Counters are gone once the input thread stops
+            self._report_frames()
+            # libvlc_media_player_stop blocks until the decoder threads join
+            await self._loop.run_in_executor(None, self.player.stop)
+        
+        self.is_playing = False
+        self._pressed_at_ns = None
+        self._current = None
+        if self._ended:
+            self._ended.set()
+        
+    def position_ms(self) -> Optional[int]:
+        """Playback position of the current video"""
+        if self.player and self.is_playing:
+            return self.player.get_time()
+        return None
+        
+    async def wait_for_completion(self) -> bool:
+        """Wait for the current video to end or be stopped; False if it failed"""
+        ended = self._ended
+        if ended:
+            await ended.wait()
+        return not self._failed
+        
+    async def cleanup(self):
+        await self.stop()
+        if self.player:
+            self.player.release()
+            self.player = None
+        for media in self.media.values():
+            media.release()
+        self.media.clear()
+        self.media_decoders.clear()
+        if self.instance:
+            self.instance.release()
+            self.instance = None
\ No newline at end of file
@@ -1,111 +1,160 @@
 import asyncio
 import logging
-import subprocess
 from pathlib import Path
+from typing import Dict, Iterable, Optional, Union
+
+from media.media_handle import MediaHandle
+
+from .decoders import DecodeChoice, DecoderSelector, VLC_DECODER_OPTIONS, probe_decoders
+from .video_backends import LibVLCBackend, SubprocessBackend, VLC_AVAILABLE
 
 logger = logging.getLogger(__name__)
 
 
 class VideoPlayer:
-    def __init__(self, settings):
+    def __init__(self, settings, catalog=None):
         self.settings = settings
-        self.current_process = None
-        self.is_playing = False
+        self.catalog = catalog
         
         # Choose player based on platform
         self.player_cmd = settings.display.video_player or "vlc"
+        self.backend = self._select_backend()
+        
+        # Software decode until initialize() has probed the hardware
+        self.decoders = DecoderSelector()
+        
+    def _select_backend(self):
+        """Prefer the persistent libVLC player, falling back to a subprocess per video"""
+        if self.settings.display.video_backend == "libvlc" and self.player_cmd == "vlc":
+            if VLC_AVAILABLE:
+                return LibVLCBackend(self.settings)
+            logger.warning("libVLC backend requested but python-vlc is unavailable")
+        return SubprocessBackend(self.settings)
+        
+    @property
+    def is_playing(self):
+        return self.backend.is_playing
+        
+    @property
+    def latency(self):
+        return self.backend.latency
         
     async def initialize(self):
         """Initialize video player"""
-        logger.info(f"Initializing video player with {self.player_cmd}")
+        logger.info(f"Initializing video player with {self.backend.name} backend")
         
-        # Test if player is available
         try:
-            result = subprocess.run(
-                [self.player_cmd, "--version"],
-                capture_output=True,
-                text=True,
-                timeout=5
-            )
-            logger.debug(f"Video player version: {result.stdout[:100]}")
+            await self.backend.initialize()
         except Exception as e:
-            logger.error(f"Video player not available: {e}")
-            raise
-            
-    async def play(self, video_path):
-        """Play a video file"""
+            if isinstance(self.backend, SubprocessBackend):
+                raise
+            logger.error(f"libVLC backend failed, using subprocess player: {e}")
+            self.backend = SubprocessBackend(self.settings)
+            await self.backend.initialize()
+        
+        await self._probe_decoders()
+        
+    async def _probe_decoders(self):
+        """Find hardware decode paths; display.hw_decode can pin one instead"""
+        loop = asyncio.get_running_loop()
+        available = await loop.run_in_executor(None, probe_decoders)
+        
+        forced = self.settings.display.hw_decode
+        if forced == "auto":
+            forced = None
+        elif forced not in VLC_DECODER_OPTIONS:
+            logger.warning(f"Unknown hw_decode {forced!r}, choosing automatically")
+            forced = None
+        
+        self.decoders = DecoderSelector(available, forced)
+        logger.info(f"Decode paths: {forced or self.decoders.describe()}")
+        
+    async def prepare(self, video_paths: Iterable[str]) -> Dict[str, MediaHandle]:
+        """Create warm, pre-parsed media handles for the given videos"""
+        video_paths = list(video_paths)
+        results = await asyncio.gather(
+            *(self.backend.prepare(path) for path in video_paths),
+            return_exceptions=True
+        )
+        
+        handles = {}
+        for video_path, result in zip(video_paths, results):
+            if isinstance(result, Exception):
+                logger.warning(f"Failed to prepare {video_path}: {result}")
+                continue
+            handles[video_path] = result
+            if result.parsed:
+                logger.debug(
+                    f"Prepared {video_path}: {result.codec} {result.width}x{result.height}, "
+                    f"{(result.duration_ms or 0) / 1000:.1f}s"
+                )
+                
+        logger.info(f"Prepared {len(handles)} of {len(video_paths)} videos")
+        return handles
+        
+    def release(self, handle: MediaHandle):
+        """Release a handle created by prepare()"""
+        self.backend.release(handle)
+        
+    async def play(self, video: Union[str, Path, MediaHandle], pressed_at_ns: Optional[int] = None):
+        """Play a video file or a prepared media handle"""
+        handle = video if isinstance(video, MediaHandle) else None
+        video_path = handle.path if handle else video
         video_file = Path(video_path)
         
-        if not video_file.exists():
+        if not self._available(video_file):
             logger.error(f"Video file not found: {video_path}")
             return False
-            
+        
         # Stop any current playback
         await self.stop()
         
-        # Build command based on player
-        if self.player_cmd == "vlc":
-            cmd = [
-                "vlc",
-                "--fullscreen",
-                "--play-and-exit",
-                "--no-video-title-show",
-                "--quiet",
-                str(video_file)
-            ]
-        elif self.player_cmd == "omxplayer":
-            cmd = [
-                "omxplayer",
-                "-b",  # Blank background
-                "-o", "hdmi",  # Audio output
-                str(video_file)
-            ]
-        else:
-            cmd = [self.player_cmd, str(video_file)]
-            
-        logger.info(f"Starting video playback: {' '.join(cmd)}")
+        decoder = self.decoder_for(handle or video_path)
+        return await self.backend.play(video_file, pressed_at_ns, handle, decoder)
         
-        try:
-            self.current_process = await asyncio.create_subprocess_exec(
-                *cmd,
-                stdout=asyncio.subprocess.DEVNULL,
-                stderr=asyncio.subprocess.DEVNULL
-            )
-            self.is_playing = True
+    def decoder_for(self, video) -> DecodeChoice:
+        """Decode path for a video, based on the codec the handle or catalog reports"""
+        codec = video.codec if isinstance(video, MediaHandle) else None
+        if self.catalog:
+            path = video.path if isinstance(video, MediaHandle) else video
+            entry = self.catalog.get(Path(path).resolve())
+            if entry and entry.codec:
+                # ffprobe's codec name is more reliable than a VLC fourcc
+                codec = entry.codec
+        return self.decoders.choose(codec)
+        
+    def duration_of(self, video) -> Optional[float]:
+        """Known duration in seconds, from a prepared handle or the media catalog"""
+        if isinstance(video, MediaHandle) and video.duration_ms:
+            return video.duration_ms / 1000
+        if self.catalog:
+            path = video.path if isinstance(video, MediaHandle) else video
+            entry = self.catalog.get(Path(path).resolve())
+            if entry and entry.duration:
+                return entry.duration
+        return None
+        
+    def position_ms(self) -> Optional[int]:
+        """Current playback position, if the backend can report it"""
+        return self.backend.position_ms()
+        
+    def _available(self, video_file: Path) -> bool:
+        """Check the media catalog first; fall back to the filesystem"""
+        if self.catalog and self.catalog.db is not None and self.catalog.exists(video_file):
             return True
-            
-        except Exception as e:
-            logger.error(f"Failed to start video playback: {e}")
-            return False
-            
+        # Transcoded renditions live outside the catalogued directories
+        return video_file.exists()
+        
     async def stop(self):
         """Stop current video playback"""
-        if self.current_process and self.is_playing:
-            logger.info("Stopping video playback")
-            
-            try:
-                self.current_process.terminate()
-                await asyncio.wait_for(
-                    self.current_process.wait(),
-                    timeout=5.0
-                )
-            except asyncio.TimeoutError:
-                logger.warning("Video player didn't terminate, forcing kill")
-                self.current_process.kill()
-                await self.current_process.wait()
-            except Exception as e:
-                logger.error(f"Error stopping video: {e}")
-                
-            self.current_process = None
-            self.is_playing = False
-            
-    async def wait_for_completion(self):
-        """Wait for current video to finish playing"""
-        if self.current_process:
-            await self.current_process.wait()
-            self.is_playing = False
-            self.current_process = None
-            
+        await self.backend.stop()
+        
+    async def wait_for_completion(self) -> bool:
+        """Wait for current video to finish playing; False if playback failed"""
+        return await self.backend.wait_for_completion()
+        
     async def cleanup(self):
         """Clean up video player resources"""
-        await self.stop()
\ No newline at end of file
+        self.latency.log_summary()
+        self.backend.frames.log_summary()
+        await self.backend.cleanup()
\ No newline at end of file
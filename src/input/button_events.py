@@ -0,0 +1,68 @@
+import asyncio
+import logging
+from collections import deque
+from dataclasses import dataclass
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ButtonEvent:
+    """One accepted button edge"""
+    button_id: int
+    pin: int
+    pressed_at_ns: int  # time.monotonic_ns() taken in the interrupt callback
+
+
+class ButtonEventQueue:
+    """Bounded queue of button presses, owned by the event loop
+
+    A press for a button that is already waiting is coalesced into the
+    queued one, which keeps the earlier timestamp. When the queue is full
+    the oldest press is dropped, so a burst never delays the newest input.
+    """
+        
+    def __init__(self, maxsize: int = 4):
+        self.maxsize = max(1, maxsize)
+        self.coalesced = 0
+        self.dropped = 0
+        
+        self._events = deque()
+        self._queued = set()  # button ids currently waiting
+        self._ready = asyncio.Event()
+        
+    def __len__(self):
+        return len(self._events)
+        
+    def put(self, event: ButtonEvent) -> bool:
+        """Queue a press; must be called on the loop thread"""
+        if event.button_id in self._queued:
+            self.coalesced += 1
+            logger.debug(f"Coalesced repeat press of button {event.button_id}")
+            return False
+        
+        if len(self._events) >= self.maxsize:
+            stale = self._events.popleft()
+            self._queued.discard(stale.button_id)
+            self.dropped += 1
+            logger.warning(f"Input queue full, dropped press of button {stale.button_id}")
+        
+        self._events.append(event)
+        self._queued.add(event.button_id)
+        self._ready.set()
+        return True
+        
+    async def get(self) -> ButtonEvent:
+        """Wait for the next press"""
+        while not self._events:
+            self._ready.clear()
+            await self._ready.wait()
+        
+        event = self._events.popleft()
+        self._queued.discard(event.button_id)
+        return event
+        
+    def clear(self):
+        """Discard all waiting presses"""
+        self._events.clear()
+        self._queued.clear()
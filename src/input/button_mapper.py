@@ -1,34 +1,116 @@
 import json
 import logging
 from pathlib import Path
-from typing import Dict, Optional
+from typing import Dict, List, Optional
+
+from config.persistence import DeferredWriter, read_with_backup
 
 logger = logging.getLogger(__name__)
 
 
+def read_mappings_file(path) -> Dict[str, str]:
+    """Parse and validate a button mapping file; raises ValueError or OSError"""
+    with open(path, 'r') as f:
+        try:
+            data = json.load(f)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"not valid JSON: {e}") from e
+            
+    mappings = data.get('mappings') if isinstance(data, dict) else None
+    if not isinstance(mappings, dict):
+        raise ValueError("expected an object with a \"mappings\" object")
+    for button_id, video_file in mappings.items():
+        if not isinstance(video_file, str) or not video_file:
+            raise ValueError(f"button {button_id} must map to a file name")
+    return {str(button_id): video_file for button_id, video_file in mappings.items()}
+
+
 class ButtonMapper:
     def __init__(self, settings):
         self.settings = settings
         self.mappings = {}
+        
+        # Button id -> absolute path of an existing video, rebuilt on reload
+        self.resolved: Dict[str, str] = {}
+        
+        # Optional source -> optimized rendition lookup (media.transcoder.Transcoder)
+        self.renditions = None
+        
+        # Batches saves from successive update_mapping() calls into one write
+        self._writer = DeferredWriter(
+            lambda: self.settings.config.button_mappings_file,
+            lambda: json.dumps({'mappings': self.mappings}, indent=2),
+            validate=read_mappings_file,
+            description="button mappings"
+        )
+        
         self.load_mappings()
         
     def load_mappings(self):
         """Load button-to-video mappings from configuration"""
         mapping_file = Path(self.settings.config.button_mappings_file)
         
-        if mapping_file.exists():
-            try:
-                with open(mapping_file, 'r') as f:
-                    data = json.load(f)
-                    self.mappings = data.get('mappings', {})
-                    logger.info(f"Loaded {len(self.mappings)} button mappings")
-            except Exception as e:
-                logger.error(f"Failed to load button mappings: {e}")
-                self.use_default_mappings()
-        else:
+        try:
+            self.mappings = read_with_backup(mapping_file, read_mappings_file)
+            logger.info(f"Loaded {len(self.mappings)} button mappings")
+        except FileNotFoundError:
             logger.warning(f"Mapping file not found: {mapping_file}")
             self.use_default_mappings()
+        except Exception as e:
+            logger.error(f"Failed to load button mappings: {e}")
+            self.use_default_mappings()
+            
+        self.resolve_mappings()
+        
+    def resolve_mappings(self):
+        """Resolve mappings to validated absolute paths, once, off the press path"""
+        # Swap in one assignment so lookups never see a half-built table
+        self.resolved = self._resolve(self.mappings)
+        
+    def _resolve(self, mappings: Dict[str, str]) -> Dict[str, str]:
+        videos_dir = Path(self.settings.media.videos_dir).resolve()
+        resolved = {}
+        
+        for button_id, video_file in mappings.items():
+            video_path = videos_dir / video_file
+            if video_path.is_file():
+                resolved[str(button_id)] = self._playable(str(video_path))
+            else:
+                logger.warning(f"Video file not found: {video_path}")
+        return resolved
+        
+    def _playable(self, video_path: str) -> str:
+        """Prefer a transcoded rendition of a video once it is ready"""
+        if self.renditions:
+            return self.renditions.rendition_for(video_path) or video_path
+        return video_path
+        
+    def reload(self) -> bool:
+        """Re-read an edited mapping file; True if any mapping changed
+
+        A file that fails to parse or validate is logged and ignored, keeping
+        the mappings in use. Changes to the videos directory arrive through
+        the media index, which calls resolve_mappings() directly.
+        """
+        mapping_file = self.settings.config.button_mappings_file
+        try:
+            mappings = read_mappings_file(mapping_file)
+        except (OSError, ValueError) as e:
+            logger.error(f"Keeping current button mappings, {mapping_file} is invalid: {e}")
+            return False
+            
+        changed = sorted(
+            button_id for button_id in set(mappings) | set(self.mappings)
+            if mappings.get(button_id) != self.mappings.get(button_id)
+        )
+        if not changed:
+            return False
             
+        resolved = self._resolve(mappings)
+        self.mappings, self.resolved = mappings, resolved
+        logger.info(f"Button mappings reloaded, changed buttons: {', '.join(changed)}")
+        return True
+        
     def use_default_mappings(self):
         """Use default button mappings"""
         self.mappings = {
@@ -41,32 +123,22 @@ class ButtonMapper:
         
     def get_video_for_button(self, button_id: int) -> Optional[str]:
         """Get the video file mapped to a button"""
-        video_file = self.mappings.get(str(button_id))
+        return self.resolved.get(str(button_id))
         
-        if video_file:
-            video_path = Path(self.settings.media.videos_dir) / video_file
-            if video_path.exists():
-                return str(video_path)
-            else:
-                logger.warning(f"Video file not found: {video_path}")
-                
-        return None
+    def get_mapped_videos(self) -> List[str]:
+        """Get paths of all mapped videos that exist on disk"""
+        return list(dict.fromkeys(self.resolved[key] for key in sorted(self.resolved)))
         
     def update_mapping(self, button_id: int, video_file: str):
         """Update a button mapping"""
         self.mappings[str(button_id)] = video_file
         self.save_mappings()
+        self.resolve_mappings()
         
     def save_mappings(self):
-        """Save current mappings to file"""
-        mapping_file = Path(self.settings.config.button_mappings_file)
+        """Save current mappings to file, batched with any further changes"""
+        self._writer.save()
         
-        try:
-            mapping_file.parent.mkdir(parents=True, exist_ok=True)
-            
-            with open(mapping_file, 'w') as f:
-                json.dump({'mappings': self.mappings}, f, indent=2)
-                
-            logger.info("Button mappings saved")
-        except Exception as e:
-            logger.error(f"Failed to save button mappings: {e}")
\ No newline at end of file
+    def flush(self):
+        """Write a pending save now"""
+        self._writer.flush()
\ No newline at end of file
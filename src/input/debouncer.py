@@ -1,25 +1,28 @@
 import time
-from typing import Dict
+from typing import Dict, Optional
 
 
 class Debouncer:
     def __init__(self, debounce_time_ms: int = 50):
-        self.debounce_time = debounce_time_ms / 1000.0  # Convert to seconds
-        self.last_press_times = {}
+        self.debounce_ns = int(debounce_time_ms * 1_000_000)
+        self.last_press_times: Dict[int, int] = {}
         
-    def should_process(self, button_id: int) -> bool:
-        """Check if button press should be processed based on debounce timing"""
-        current_time = time.time()
+    def should_process(self, button_id: int, now_ns: Optional[int] = None) -> bool:
+        """Check if button press should be processed based on debounce timing
         
-        if button_id in self.last_press_times:
-            time_since_last = current_time - self.last_press_times[button_id]
-            
-            if time_since_last < self.debounce_time:
-                return False
+        Uses the monotonic clock so wall-clock adjustments (NTP, a Pi without
+        an RTC setting its clock at boot) cannot swallow or double presses.
+        """
+        if now_ns is None:
+            now_ns = time.monotonic_ns()
+        
+        last = self.last_press_times.get(button_id)
+        if last is not None and now_ns - last < self.debounce_ns:
+            return False
                 
-        self.last_press_times[button_id] = current_time
+        self.last_press_times[button_id] = now_ns
         return True
         
     def reset(self):
         """Reset all debounce timers"""
-        self.last_press_times.clear()
\ No newline at end of file
+        self.last_press_times.clear()
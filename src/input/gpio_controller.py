@@ -29,6 +29,9 @@ except ImportError:
         def close(self):
             pass
 
+from monitoring.metrics import LatencyStats
+
+from .button_events import ButtonEvent, ButtonEventQueue
 from .button_mapper import ButtonMapper
 from .debouncer import Debouncer
 
@@ -36,14 +39,20 @@ logger = logging.getLogger(__name__)
 
 
 class GPIOController:
-    def __init__(self, settings):
+    def __init__(self, settings, button_mapper=None):
         self.settings = settings
-        self.button_mapper = ButtonMapper(settings)
+        self.button_mapper = button_mapper or ButtonMapper(settings)
         self.debouncer = Debouncer(settings.input.debounce_time)
         
-        # Callback for button press events
+        # Callback for button press events: coroutine(button_id, pressed_at_ns)
         self.on_button_press = None
         
+        # Presses cross from gpiozero's thread to the loop through this queue
+        self.events = ButtonEventQueue(settings.input.event_queue_size)
+        self.queue_latency = LatencyStats("Button edge-to-dispatch latency")
+        self._loop = None
+        self._dispatch_task = None
+        
         # GPIO pin configuration
         self.button_pins = {
             1: settings.input.button1_pin,
@@ -59,6 +68,10 @@ class GPIOController:
         """Initialize GPIO pins"""
         logger.info("Initializing GPIO controller (Pi 5 compatible)")
         
+        self._loop = asyncio.get_running_loop()
+        if self._dispatch_task is None:
+            self._dispatch_task = asyncio.create_task(self._dispatch())
+        
         if not GPIO_AVAILABLE:
             logger.warning("GPIO not available - running in mock mode")
             return
@@ -100,20 +113,49 @@ class GPIOController:
             logger.error(f"Failed to setup button {button_id} on GPIO {pin}: {e}")
         
     def _button_callback(self, button_id: int, pin: int):
-        """Handle button press interrupt"""
+        """Handle button press interrupt; runs on gpiozero's thread"""
+        # Timestamp the edge before anything else can delay it
+        pressed_at_ns = time.monotonic_ns()
+        
         # Check debouncer (additional software debounce)
-        if not self.debouncer.should_process(button_id):
+        if not self.debouncer.should_process(button_id, pressed_at_ns):
+            return
+        
+        if self._loop is None or self._loop.is_closed():
             return
-            
-        logger.info(f"Button {button_id} pressed (GPIO {pin})")
         
-        # Call the registered callback
-        if self.on_button_press:
-            asyncio.create_task(self.on_button_press(button_id))
+        event = ButtonEvent(button_id, pin, pressed_at_ns)
+        try:
+            self._loop.call_soon_threadsafe(self.events.put, event)
+        except RuntimeError:
+            # Loop closed between the check and the call during shutdown
+            pass
+            
+    async def _dispatch(self):
+        """Hand queued presses to the registered callback, one at a time"""
+        while True:
+            event = await self.events.get()
+            self.queue_latency.record_ns(event.pressed_at_ns, time.monotonic_ns())
+            logger.info(f"Button {event.button_id} pressed (GPIO {event.pin})")
+            
+            if not self.on_button_press:
+                continue
+            try:
+                await self.on_button_press(event.button_id, event.pressed_at_ns)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Button {event.button_id} handler failed: {e}")
             
     async def cleanup(self):
         """Clean up GPIO resources"""
         logger.info("Cleaning up GPIO controller")
+        if self._dispatch_task:
+            self._dispatch_task.cancel()
+            self._dispatch_task = None
+        self.events.clear()
+        self.queue_latency.log_summary()
+        
         for button_id, button in self.buttons.items():
             try:
                 button.close()
@@ -5,12 +5,15 @@ import argparse
 import logging
 import signal
 import sys
+import time
 from pathlib import Path
 
 from config.settings import Settings
+from config.watcher import ConfigWatcher
 from display.display_controller import DisplayController
 from input.gpio_controller import GPIOController
 from media.content_loader import ContentLoader
+from monitoring.startup import StartupTimeline
 from network.ap_manager import AccessPointManager
 from network.smb_server import SMBServer
 
@@ -22,57 +25,120 @@ logger = logging.getLogger(__name__)
 
 
 class WW2Kiosk:
-    def __init__(self, debug=False):
+    def __init__(self, debug=False, config_file=None):
         self.debug = debug
-        self.settings = Settings()
+        self.timeline = StartupTimeline()
+        self.settings = Settings.from_file(config_file)
         self.running = False
+        self._stop_event = asyncio.Event()
+        self._startup_task = None
         
         self.display_controller = None
         self.gpio_controller = None
         self.content_loader = None
+        self.config_watcher = None
         self.ap_manager = None
         self.smb_server = None
         
     async def initialize(self):
-        """Initialize all subsystems"""
+        """Initialize everything needed for the first slide; the rest waits for finish_startup()"""
         logger.info("Initializing WW2 Kiosk...")
+        timeline = self.timeline
         
         try:
-            # Load media content
             self.content_loader = ContentLoader(self.settings)
-            await self.content_loader.scan_media()
+            self.display_controller = DisplayController(
+                self.settings,
+                self.content_loader.media_index,
+                self.content_loader.catalog,
+                self.content_loader.playlist_engine
+            )
+            self.gpio_controller = GPIOController(
+                self.settings, self.content_loader.button_mapper
+            )
+            self.gpio_controller.on_button_press = self.handle_button_press
             
-            # Initialize display
-            self.display_controller = DisplayController(self.settings)
-            await self.display_controller.initialize()
+            # Edits to the config files are applied live from finish_startup() on
+            self.config_watcher = ConfigWatcher(
+                self.settings,
+                self.content_loader.button_mapper,
+                self.content_loader.playlist_manager
+            )
+            self.config_watcher.subscribe(self.display_controller.on_config_change)
+            self.config_watcher.subscribe(self.content_loader.on_config_change)
             
-            # Initialize GPIO
-            self.gpio_controller = GPIOController(self.settings)
-            self.gpio_controller.on_button_press = self.handle_button_press
-            await self.gpio_controller.initialize()
+            # Initialize display
+            async with timeline.phase("display"):
+                await self.display_controller.initialize_display()
+            timeline.mark("first frame")
             
-            # Initialize network services
-            if self.settings.network.enable_ap:
-                self.ap_manager = AccessPointManager(self.settings)
-                await self.ap_manager.start()
+            async with timeline.phase("subsystems"):
+                await asyncio.gather(
+                    timeline.run("media scan", self.content_loader.scan_media()),
+                    timeline.run("video player", self.display_controller.video_player.initialize()),
+                    timeline.run("gpio", self.gpio_controller.initialize()),
+                )
+            self.content_loader.video_player = self.display_controller.video_player
             
-            if self.settings.network.enable_smb:
-                self.smb_server = SMBServer(self.settings)
-                await self.smb_server.start()
+            async with timeline.phase("slide list"):
+                await self.display_controller.slideshow.scan_images()
             
             logger.info("Initialization complete")
             
         except Exception as e:
             logger.error(f"Failed to initialize: {e}")
             raise
+            
+    async def finish_startup(self):
+        """Deferred startup work that must not delay the first slide"""
+        timeline = self.timeline
+        slideshow = self.display_controller.slideshow
+        
+        try:
+            await asyncio.wait_for(slideshow.content_shown.wait(), timeout=30)
+            timeline.mark("first slide")
+        except asyncio.TimeoutError:
+            logger.warning("No slide on screen 30s after start")
+        
+        try:
+            async with timeline.phase("video handles"):
+                await self.content_loader.prepare_video_handles()
+            async with timeline.phase("media watch"):
+                await self.content_loader.start_watching()
+                await self.config_watcher.start()
+            async with timeline.phase("network"):
+                await self._start_network()
+        except Exception as e:
+            logger.error(f"Deferred startup failed: {e}")
+        
+        timeline.log()
+        
+    async def _start_network(self):
+        """Start the access point and file share; neither depends on the other"""
+        services = []
+        if self.settings.network.enable_ap:
+            self.ap_manager = AccessPointManager(self.settings)
+            services.append(self.ap_manager)
+        
+        if self.settings.network.enable_smb:
+            self.smb_server = SMBServer(self.settings)
+            services.append(self.smb_server)
+        
+        results = await asyncio.gather(
+            *(service.start() for service in services), return_exceptions=True
+        )
+        for result in results:
+            if isinstance(result, Exception):
+                raise result
     
-    async def handle_button_press(self, button_id):
-        """Handle button press events"""
-        logger.info(f"Button {button_id} pressed")
+    async def handle_button_press(self, button_id, pressed_at_ns=None):
+        """Handle button press events; pressed_at_ns is the monotonic time of the GPIO edge"""
+        pressed_at_ns = pressed_at_ns or time.monotonic_ns()
         
-        video_file = self.content_loader.get_video_for_button(button_id)
-        if video_file:
-            await self.display_controller.play_video(video_file)
+        video = self.content_loader.get_handle_for_button(button_id)
+        video = video or self.content_loader.get_video_for_button(button_id)
+        if video:
+            await self.display_controller.play_video(video, pressed_at_ns)
         else:
             logger.warning(f"No video mapped to button {button_id}")
     
@@ -84,24 +150,34 @@ class WW2Kiosk:
         try:
             # Start slideshow by default
             await self.display_controller.start_slideshow()
+            self._startup_task = asyncio.create_task(self.finish_startup())
+            
+            # Everything else is driven by timers and events; sleep until stopped
+            await self._stop_event.wait()
             
-            # Main event loop
-            while self.running:
-                await asyncio.sleep(0.1)
-                
-                # Check for idle timeout
-                if self.display_controller.should_return_to_slideshow():
-                    await self.display_controller.start_slideshow()
-                    
         except Exception as e:
             logger.error(f"Runtime error: {e}")
             raise
     
+    def request_stop(self):
+        """Ask the run loop to exit"""
+        self.running = False
+        self._stop_event.set()
+    
     async def shutdown(self):
         """Graceful shutdown"""
         logger.info("Shutting down WW2 Kiosk...")
         self.running = False
         
+        if self._startup_task:
+            self._startup_task.cancel()
+        
+        if self.config_watcher:
+            await self.config_watcher.stop()
+        
+        if self.content_loader:
+            await self.content_loader.cleanup()
+        
         if self.display_controller:
             await self.display_controller.cleanup()
         
@@ -126,16 +202,16 @@ async def main():
     if args.debug:
         logging.getLogger().setLevel(logging.DEBUG)
     
-    kiosk = WW2Kiosk(debug=args.debug)
+    kiosk = WW2Kiosk(debug=args.debug, config_file=args.config)
     
     # Setup signal handlers
-    def signal_handler(sig, frame):
+    def signal_handler():
         logger.info("Received shutdown signal")
-        asyncio.create_task(kiosk.shutdown())
-        sys.exit(0)
+        kiosk.request_stop()
     
-    signal.signal(signal.SIGINT, signal_handler)
-    signal.signal(signal.SIGTERM, signal_handler)
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, signal_handler)
     
     try:
         await kiosk.initialize()
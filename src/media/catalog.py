@@ -0,0 +1,324 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import subprocess
+from dataclasses import dataclass, fields
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+from PIL import Image
+
+from .media_index import MediaChange, MediaIndex
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS media (
+    path TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    width INTEGER,
+    height INTEGER,
+    orientation INTEGER,
+    duration REAL,
+    codec TEXT,
+    content_hash TEXT,
+    probe_error TEXT,
+    probed INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS media_kind ON media(kind, path);
+CREATE INDEX IF NOT EXISTS media_name ON media(name);
+"""
+
+EXIF_ORIENTATION = 0x0112
+HASH_CHUNK = 1024 * 1024
+
+
+@dataclass
+class CatalogEntry:
+    """Everything the catalog knows about one media file"""
+    path: str
+    name: str
+    kind: str
+    size: int
+    mtime_ns: int
+    width: Optional[int] = None
+    height: Optional[int] = None
+    orientation: Optional[int] = None
+    duration: Optional[float] = None  # seconds
+    codec: Optional[str] = None
+    content_hash: Optional[str] = None
+    probe_error: Optional[str] = None
+    probed: bool = False
+        
+    @property
+    def usable(self) -> bool:
+        """False once probing showed the file cannot be decoded"""
+        return self.probe_error is None
+
+
+COLUMNS = [f.name for f in fields(CatalogEntry)]
+
+
+def probe_image(path: str) -> Dict:
+    """Read image dimensions and EXIF orientation without decoding pixels"""
+    with Image.open(path) as img:
+        orientation = img.getexif().get(EXIF_ORIENTATION, 1)
+        return {
+            'width': img.width,
+            'height': img.height,
+            'orientation': orientation,
+            'codec': img.format.lower() if img.format else None,
+        }
+
+
+def probe_video(path: str) -> Dict:
+    """Read duration, codec and resolution of the first video stream with ffprobe"""
+    result = subprocess.run(
+        [
+            "ffprobe", "-v", "error",
+            "-select_streams", "v:0",
+            "-show_entries", "stream=codec_name,width,height:format=duration",
+            "-print_format", "json",
+            path
+        ],
+        capture_output=True,
+        text=True,
+        timeout=30
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip() or "ffprobe failed")
+    
+    info = json.loads(result.stdout)
+    stream = (info.get('streams') or [{}])[0]
+    duration = info.get('format', {}).get('duration')
+    return {
+        'width': stream.get('width'),
+        'height': stream.get('height'),
+        'codec': stream.get('codec_name'),
+        'duration': float(duration) if duration else None,
+    }
+
+
+def hash_file(path: str) -> str:
+    """BLAKE2b digest of the file contents"""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        while chunk := f.read(HASH_CHUNK):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def probe_file(path: str, kind: str) -> Dict:
+    """Collect metadata for a file; runs in a worker thread"""
+    metadata = {}
+    try:
+        metadata.update(probe_image(path) if kind == 'pictures' else probe_video(path))
+    except FileNotFoundError as e:
+        if kind == 'videos' and e.filename == 'ffprobe':
+            logger.debug("ffprobe not installed, skipping video probe")
+        else:
+            raise
+    except Exception as e:
+        logger.warning(f"Could not probe {path}: {e}")
+        metadata['probe_error'] = str(e) or type(e).__name__
+    
+    metadata['content_hash'] = hash_file(path)
+    return metadata
+
+
+class MediaCatalog:
+    """SQLite-backed metadata for every indexed media file
+
+    Startup only compares size and mtime reported by the media index against
+    stored rows; files that are new or changed are probed one at a time by a
+    background worker, so the slideshow and player never wait on probing.
+    """
+        
+    def __init__(self, settings, media_index: MediaIndex):
+        self.settings = settings
+        self.media_index = media_index
+        self.db_path = Path(settings.media.catalog_file)
+        
+        self.db = None
+        self._queue = asyncio.Queue()
+        self._worker_task = None
+        
+        media_index.subscribe(self._on_media_change)
+        
+    async def open(self):
+        """Open the database, reconcile it with the index and start probing"""
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.db = sqlite3.connect(self.db_path)
+        self.db.row_factory = sqlite3.Row
+        # WAL with NORMAL sync keeps writes cheap on SD cards
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript(SCHEMA)
+        
+        for kind in self.media_index.directories:
+            self._sync_kind(kind)
+        
+        # Also pick up anything a previous run did not finish probing
+        for row in self.db.execute("SELECT path, kind FROM media WHERE probed = 0"):
+            self._queue.put_nowait((row['path'], row['kind']))
+        
+        if self._worker_task is None:
+            self._worker_task = asyncio.create_task(self._worker())
+        
+        logger.info(f"Media catalog open, {self._queue.qsize()} files to probe")
+        
+    def _sync_kind(self, kind: str):
+        """Bring rows for one directory in line with the index, using stat data only"""
+        indexed = self.media_index.entries(kind)
+        stored = {
+            row['path']: (row['size'], row['mtime_ns'])
+            for row in self.db.execute("SELECT path, size, mtime_ns FROM media WHERE kind = ?", (kind,))
+        }
+        
+        stale = [(path,) for path in stored if path not in indexed]
+        changed = [
+            (path, kind, signature) for path, signature in indexed.items()
+            if stored.get(path) != signature
+        ]
+        
+        with self.db:
+            self.db.executemany("DELETE FROM media WHERE path = ?", stale)
+            self._upsert_unprobed(changed)
+        
+    def _upsert_unprobed(self, rows):
+        """Record new or changed files, clearing stale metadata until re-probed"""
+        self.db.executemany(
+            "INSERT OR REPLACE INTO media (path, name, kind, size, mtime_ns, probed) "
+            "VALUES (?, ?, ?, ?, ?, 0)",
+            [(path, os.path.basename(path), kind, size, mtime_ns)
+             for path, kind, (size, mtime_ns) in rows]
+        )
+        
+    def _on_media_change(self, change: MediaChange):
+        if self.db is None:
+            # open() reconciles everything in one pass
+            return
+        
+        indexed = self.media_index.entries(change.kind)
+        touched = [path for path in change.added + change.modified if path in indexed]
+        with self.db:
+            self.db.executemany("DELETE FROM media WHERE path = ?", [(path,) for path in change.removed])
+            self._upsert_unprobed([(path, change.kind, indexed[path]) for path in touched])
+        
+        for path in touched:
+            self._queue.put_nowait((path, change.kind))
+        
+    async def _worker(self):
+        """Probe queued files one at a time, off the event loop"""
+        loop = asyncio.get_running_loop()
+        while True:
+            path, kind = await self._queue.get()
+            try:
+                entry = self.get(path)
+                if entry is None or entry.probed:
+                    continue
+                metadata = await loop.run_in_executor(None, probe_file, path, kind)
+                self._store_probe(entry, metadata)
+            except FileNotFoundError:
+                continue
+            except Exception as e:
+                logger.error(f"Failed to catalog {path}: {e}")
+            finally:
+                self._queue.task_done()
+        
+    def _store_probe(self, entry: CatalogEntry, metadata: Dict):
+        # Skip results for a file that changed again while it was being probed
+        with self.db:
+            self.db.execute(
+                "UPDATE media SET width = ?, height = ?, orientation = ?, duration = ?, "
+                "codec = ?, content_hash = ?, probe_error = ?, probed = 1 "
+                "WHERE path = ? AND size = ? AND mtime_ns = ?",
+                (
+                    metadata.get('width'), metadata.get('height'),
+                    metadata.get('orientation'), metadata.get('duration'),
+                    metadata.get('codec'), metadata.get('content_hash'),
+                    metadata.get('probe_error'), entry.path, entry.size, entry.mtime_ns,
+                )
+            )
+        
+    def get(self, path) -> Optional[CatalogEntry]:
+        """Look up one file"""
+        if self.db is None:
+            return None
+        row = self.db.execute(
+            f"SELECT {', '.join(COLUMNS)} FROM media WHERE path = ?", (str(path),)
+        ).fetchone()
+        return self._entry(row) if row else None
+        
+    def exists(self, path) -> bool:
+        """Check whether a file is catalogued, without touching the filesystem"""
+        if self.db is None:
+            return self.media_index.contains(path)
+        return self.db.execute(
+            "SELECT 1 FROM media WHERE path = ?", (str(path),)
+        ).fetchone() is not None
+        
+    def files(self, kind: str, usable_only: bool = True) -> List[str]:
+        """Sorted paths of catalogued files of a kind"""
+        if self.db is None:
+            return self.media_index.files(kind)
+        
+        query = "SELECT path FROM media WHERE kind = ?"
+        if usable_only:
+            query += " AND probe_error IS NULL"
+        return [row[0] for row in self.db.execute(query + " ORDER BY path", (kind,))]
+        
+    def iter_files(self, kind: str, usable_only: bool = True) -> Iterator[str]:
+        """Stream paths of a kind in sorted order without building a list"""
+        if self.db is None:
+            yield from self.media_index.files(kind)
+            return
+        
+        query = "SELECT path FROM media WHERE kind = ?"
+        if usable_only:
+            query += " AND probe_error IS NULL"
+        for row in self.db.execute(query + " ORDER BY path", (kind,)):
+            yield row[0]
+        
+    def count(self, kind: str, usable_only: bool = True) -> int:
+        """Number of catalogued files of a kind"""
+        if self.db is None:
+            return len(self.media_index.entries(kind))
+        
+        query = "SELECT COUNT(*) FROM media WHERE kind = ?"
+        if usable_only:
+            query += " AND probe_error IS NULL"
+        return self.db.execute(query, (kind,)).fetchone()[0]
+        
+    def find_by_name(self, kind: str, name: str) -> Optional[str]:
+        """Find a file of a kind by its base name"""
+        if self.db is None:
+            return next(
+                (path for path in self.media_index.files(kind) if os.path.basename(path) == name),
+                None
+            )
+        row = self.db.execute(
+            "SELECT path FROM media WHERE kind = ? AND name = ? LIMIT 1", (kind, name)
+        ).fetchone()
+        return row[0] if row else None
+        
+    @staticmethod
+    def _entry(row) -> CatalogEntry:
+        entry = CatalogEntry(*row)
+        entry.probed = bool(entry.probed)
+        return entry
+        
+    async def close(self):
+        """Stop the worker and close the database"""
+        if self._worker_task:
+            self._worker_task.cancel()
+            self._worker_task = None
+        if self.db:
+            self.db.close()
+            self.db = None
\ No newline at end of file
@@ -1,8 +1,17 @@
 import logging
 from pathlib import Path
-from typing import List, Optional
+from typing import Dict, List, Optional
 
+from input.button_mapper import ButtonMapper
+
+from .catalog import MediaCatalog
+from .image_ingest import ImageIngestor
+from .media_handle import MediaHandle
+from .media_index import MediaChange, MediaIndex
+from .playlist_engine import PlaylistEngine
 from .playlist_manager import PlaylistManager
+from .prewarm import VideoPrewarmer
+from .transcoder import Transcoder
 
 logger = logging.getLogger(__name__)
 
@@ -10,13 +19,36 @@ logger = logging.getLogger(__name__)
 class ContentLoader:
     def __init__(self, settings):
         self.settings = settings
-        self.playlist_manager = PlaylistManager(settings)
+        self.button_mapper = ButtonMapper(settings)
         
         self.videos_dir = Path(settings.media.videos_dir)
         self.pictures_dir = Path(settings.media.pictures_dir)
         
-        self.videos = []
-        self.pictures = []
+        # Shared with the slideshow so both see the same files
+        self.media_index = MediaIndex(settings)
+        self.media_index.subscribe(self._on_media_change)
+        self.catalog = MediaCatalog(settings, self.media_index)
+        
+        self.playlist_manager = PlaylistManager(settings, self.catalog)
+        
+        # Screen-sized picture derivatives, read by the slideshow's frame cache
+        self.image_ingestor = ImageIngestor(settings, self.media_index)
+        
+        # Buttons play the Pi-optimized rendition of a video once it exists
+        self.transcoder = Transcoder(settings, self.media_index, self.catalog)
+        self.transcoder.subscribe(self._on_rendition_ready)
+        self.button_mapper.renditions = self.transcoder
+        
+        # Decides what the slideshow shows while a playlist is active
+        self.playlist_engine = PlaylistEngine(self.playlist_manager, self.catalog)
+        self.playlist_engine.renditions = self.transcoder
+        
+        # Keeps the start of every mapped video in the page cache
+        self.prewarmer = VideoPrewarmer(settings, self.button_mapper)
+        
+        # Set once the display is up; used to warm mapped videos
+        self.video_player = None
+        self.video_handles: Dict[str, MediaHandle] = {}
         
     async def scan_media(self):
         """Scan media directories for content"""
@@ -26,60 +58,131 @@ class ContentLoader:
         self.videos_dir.mkdir(parents=True, exist_ok=True)
         self.pictures_dir.mkdir(parents=True, exist_ok=True)
         
-        # Scan for videos
-        self.videos = await self._scan_videos()
-        logger.info(f"Found {len(self.videos)} videos")
+        # One scandir pass per directory; later changes arrive as events
+        await self.media_index.scan()
         
-        # Scan for pictures
-        self.pictures = await self._scan_pictures()
-        logger.info(f"Found {len(self.pictures)} pictures")
+        # Metadata is reconciled from stat data; probing continues in the background
+        if self.catalog.db is None:
+            try:
+                await self.catalog.open()
+            except Exception as e:
+                logger.error(f"Media catalog unavailable: {e}")
+                
+        logger.info(f"Found {self.catalog.count('videos')} videos")
+        logger.info(f"Found {self.catalog.count('pictures')} pictures")
         
         # Load playlists
         await self.playlist_manager.load_playlists()
         
-    async def _scan_videos(self) -> List[Path]:
-        """Scan for video files"""
-        videos = []
-        video_extensions = ['*.mp4', '*.avi', '*.mkv', '*.mov', '*.wmv']
-        
-        for ext in video_extensions:
-            videos.extend(self.videos_dir.glob(ext))
-            videos.extend(self.videos_dir.glob(ext.upper()))
-            
-        return sorted(videos)
+    @property
+    def videos(self) -> List[Path]:
+        """Catalogued video files"""
+        return [Path(path) for path in self.catalog.files('videos')]
         
-    async def _scan_pictures(self) -> List[Path]:
-        """Scan for picture files"""
-        pictures = []
-        picture_extensions = ['*.jpg', '*.jpeg', '*.png', '*.bmp', '*.gif']
+    @property
+    def pictures(self) -> List[Path]:
+        """Catalogued picture files"""
+        return [Path(path) for path in self.catalog.files('pictures')]
         
-        for ext in picture_extensions:
-            pictures.extend(self.pictures_dir.glob(ext))
-            pictures.extend(self.pictures_dir.glob(ext.upper()))
+    async def _on_media_change(self, change: MediaChange):
+        """Re-resolve button mappings when the videos directory changes"""
+        if change.kind != 'videos':
+            return
             
-        return sorted(pictures)
+        before = self.get_mapped_videos()
+        self.button_mapper.resolve_mappings()
+        mapped = self.get_mapped_videos()
         
+        touched = set(change.added) | set(change.removed) | set(change.modified)
+        if mapped != before or touched.intersection(mapped):
+            await self.prepare_video_handles()
+            
+    async def _on_rendition_ready(self, source: str):
+        """Switch buttons over to a newly transcoded rendition"""
+        before = self.get_mapped_videos()
+        self.button_mapper.resolve_mappings()
+        if self.get_mapped_videos() != before:
+            await self.prepare_video_handles()
+            
     def get_video_for_button(self, button_id: int) -> Optional[str]:
         """Get video path for a button press"""
-        # First check button mappings
-        from ..input.button_mapper import ButtonMapper
-        mapper = ButtonMapper(self.settings)
-        return mapper.get_video_for_button(button_id)
+        # In-memory lookup; the mapping table is resolved ahead of time
+        return self.button_mapper.get_video_for_button(button_id)
+        
+    def get_mapped_videos(self) -> List[str]:
+        """Get paths of all videos that are mapped to a button"""
+        return self.button_mapper.get_mapped_videos()
         
+    def get_handle_for_button(self, button_id: int) -> Optional[MediaHandle]:
+        """Get the warm media handle for a button, if one was prepared"""
+        video_path = self.get_video_for_button(button_id)
+        if video_path:
+            return self.video_handles.get(video_path)
+        return None
+        
+    async def prepare_video_handles(self):
+        """Pre-parse every mapped video so a press only has to start playback"""
+        self.prewarmer.request()
+        if not self.video_player:
+            return
+            
+        # Files may have been replaced in place, so re-probe from scratch. The
+        # old handles stay usable by presses until the new ones are swapped in
+        handles = await self.video_player.prepare(self.get_mapped_videos())
+        replaced, self.video_handles = self.video_handles, handles
+        for handle in replaced.values():
+            self.video_player.release(handle)
+        
+    async def sync_video_handles(self):
+        """Warm newly mapped videos and release unmapped ones, keeping the rest"""
+        self.prewarmer.request()
+        if not self.video_player:
+            return
+            
+        mapped = self.get_mapped_videos()
+        for video_path in [path for path in self.video_handles if path not in mapped]:
+            self.video_player.release(self.video_handles.pop(video_path))
+            
+        missing = [path for path in mapped if path not in self.video_handles]
+        if missing:
+            self.video_handles.update(await self.video_player.prepare(missing))
+            
+    async def on_config_change(self, change):
+        """Follow button mappings edited while running (config.watcher.ConfigChange)"""
+        if change.mappings:
+            await self.sync_video_handles()
+            
     def get_video_by_name(self, name: str) -> Optional[Path]:
         """Get video by filename"""
-        for video in self.videos:
-            if video.name == name:
-                return video
-        return None
+        path = self.catalog.find_by_name('videos', name)
+        return Path(path) if path else None
         
     def get_picture_by_name(self, name: str) -> Optional[Path]:
         """Get picture by filename"""
-        for picture in self.pictures:
-            if picture.name == name:
-                return picture
-        return None
+        path = self.catalog.find_by_name('pictures', name)
+        return Path(path) if path else None
         
+    async def start_watching(self):
+        """Start following media changes in the background"""
+        await self.media_index.start()
+        await self.transcoder.start()
+        await self.image_ingestor.start()
+        # Pick up renditions left by a previous run
+        self.button_mapper.resolve_mappings()
+        await self.prewarmer.start()
+                
     async def refresh(self):
         """Refresh media content"""
-        await self.scan_media()
\ No newline at end of file
+        await self.scan_media()
+        self.button_mapper.load_mappings()
+        await self.prepare_video_handles()
+        
+    async def cleanup(self):
+        """Stop background work and write unsaved playlists and mappings"""
+        self.playlist_manager.flush()
+        self.button_mapper.flush()
+        await self.media_index.stop()
+        await self.transcoder.stop()
+        await self.image_ingestor.stop()
+        await self.prewarmer.stop()
+        await self.catalog.close()
\ No newline at end of file
@@ -0,0 +1,89 @@
+import asyncio
+import logging
+import os
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List
+
+logger = logging.getLogger(__name__)
+
+
+def remove_file(path: Path):
+    """Delete a derived file, tolerating one that is already gone"""
+    try:
+        path.unlink()
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        logger.warning(f"Could not remove {path}: {e}")
+
+
+async def adopt_outputs(output_dir: Path, wanted: Dict[str, str]) -> Dict[str, str]:
+    """Take over derived files left by a previous run and delete the rest
+
+    wanted maps the file name each source's output would have to the source;
+    returns source -> path for the outputs already there.
+    """
+    output_dir.mkdir(parents=True, exist_ok=True)
+    loop = asyncio.get_running_loop()
+    existing = await loop.run_in_executor(None, os.listdir, output_dir)
+    
+    adopted = {}
+    for name in existing:
+        if name in wanted:
+            adopted[wanted[name]] = str(output_dir / name)
+        else:
+            # Orphans and partial output from an interrupted run
+            remove_file(output_dir / name)
+    return adopted
+
+
+class JobQueue:
+    """Source paths waiting to be processed by a fixed number of worker tasks
+
+    A source already waiting is not queued twice. A failed job is logged and
+    does not stop its worker.
+    """
+        
+    def __init__(self, process: Callable[[str], Awaitable], description: str):
+        self.process = process
+        self.description = description
+        
+        self._queue = asyncio.Queue()
+        self._queued = set()
+        self._workers: List[asyncio.Task] = []
+        
+    @property
+    def running(self) -> bool:
+        return bool(self._workers)
+        
+    def qsize(self) -> int:
+        return self._queue.qsize()
+        
+    def put(self, source: str):
+        if source not in self._queued:
+            self._queued.add(source)
+            self._queue.put_nowait(source)
+        
+    def start(self, worker_count: int):
+        for _ in range(worker_count):
+            self._workers.append(asyncio.create_task(self._worker()))
+        
+    async def _worker(self):
+        while True:
+            source = await self._queue.get()
+            self._queued.discard(source)
+            try:
+                await self.process(source)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"{self.description} of {source} failed: {e}")
+            finally:
+                self._queue.task_done()
+        
+    async def stop(self):
+        """Cancel the workers, including the jobs they are running"""
+        workers, self._workers = self._workers, []
+        for worker in workers:
+            worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
\ No newline at end of file
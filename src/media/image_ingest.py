@@ -0,0 +1,171 @@
+import asyncio
+import hashlib
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Tuple
+
+from PIL import Image, ImageOps
+
+from .catalog import EXIF_ORIENTATION
+from .derived_files import JobQueue, adopt_outputs, remove_file
+from .media_index import MediaChange, MediaIndex
+
+logger = logging.getLogger(__name__)
+
+DERIVATIVE_SUFFIX = ".jpg"
+DERIVATIVE_QUALITY = 90
+
+# EXIF orientations that swap width and height
+TRANSPOSED_ORIENTATIONS = frozenset({5, 6, 7, 8})
+
+
+def derivative_name(image_path, box: Tuple[int, int]) -> str:
+    """File name of the derivative of the current version of an image"""
+    stat = os.stat(image_path)
+    width, height = box
+    raw = f"{os.path.abspath(image_path)}|{stat.st_mtime_ns}|{stat.st_size}|{width}x{height}"
+    return hashlib.sha1(raw.encode()).hexdigest() + DERIVATIVE_SUFFIX
+
+
+def load_display_image(image_path, box: Tuple[int, int]) -> Image.Image:
+    """Open an image upright, in RGB, scaled to fit box
+
+    JPEGs are decoded with draft() so libjpeg scales in the DCT domain and
+    never materializes the full-size scan.
+    """
+    with Image.open(image_path) as img:
+        orientation = img.getexif().get(EXIF_ORIENTATION, 1)
+        # draft() sees the stored, not the displayed, orientation
+        draft_box = box[::-1] if orientation in TRANSPOSED_ORIENTATIONS else box
+        img.draft('RGB', draft_box)
+        
+        img = ImageOps.exif_transpose(img)
+        img = _to_rgb(img)
+        img.thumbnail(box, Image.Resampling.LANCZOS)
+        return img
+
+
+def _to_rgb(img: Image.Image) -> Image.Image:
+    """Convert any mode to RGB, flattening transparency onto black"""
+    if img.mode == 'RGB':
+        return img
+    if img.mode in ('I;16', 'I;16B', 'I;16L', 'I'):
+        # 16-bit greyscale scans
+        img = img.convert('I').point(lambda value: value / 256).convert('L')
+    if img.mode == 'P':
+        img = img.convert('RGBA' if 'transparency' in img.info else 'RGB')
+    if img.mode in ('RGBA', 'LA', 'PA'):
+        background = Image.new('RGB', img.size, (0, 0, 0))
+        background.paste(img.convert('RGBA'), mask=img.getchannel('A'))
+        return background
+    return img.convert('RGB')
+
+
+def write_derivative(image_path: str, box: Tuple[int, int], output_dir: str) -> str:
+    """Worker process: write a screen-sized JPEG of an image, if not already there"""
+    output = Path(output_dir) / derivative_name(image_path, box)
+    if output.exists():
+        return str(output)
+    
+    img = load_display_image(image_path, box)
+    tmp_file = output.with_suffix(f".{os.getpid()}.tmp")
+    try:
+        img.save(tmp_file, 'JPEG', quality=DERIVATIVE_QUALITY, optimize=True)
+        os.replace(tmp_file, output)
+    finally:
+        if tmp_file.exists():
+            tmp_file.unlink()
+    return str(output)
+
+
+class ImageIngestor:
+    """Writes display-resolution derivatives of uploaded pictures in a process pool
+
+    Derivatives are upright RGB JPEGs no larger than the configured display,
+    stored in <cache_dir>/derivatives and named after the source path, size
+    and mtime, so the slideshow never has to decode a full-size scan.
+    """
+        
+    def __init__(self, settings, media_index: MediaIndex):
+        self.settings = settings
+        self.media_index = media_index
+        
+        self.output_dir = Path(settings.media.cache_dir) / "derivatives"
+        self.box = (settings.display.width, settings.display.height)
+        self.worker_count = max(1, settings.media.ingest_workers)
+        
+        self.derivatives: Dict[str, str] = {}  # source path -> derivative path
+        
+        self.executor = None
+        self._jobs = JobQueue(self._ingest, "Ingest")
+        
+        media_index.subscribe(self._on_media_change)
+        
+    async def start(self):
+        """Adopt existing derivatives, drop orphans and ingest what is missing"""
+        loop = asyncio.get_running_loop()
+        wanted = await loop.run_in_executor(None, self._wanted_names)
+        self.derivatives.update(await adopt_outputs(self.output_dir, wanted))
+        
+        for source in sorted(self.media_index.entries('pictures')):
+            if source not in self.derivatives:
+                self._jobs.put(source)
+        
+        # forkserver: forking a process that already runs libVLC and pygame threads is unsafe
+        self.executor = ProcessPoolExecutor(
+            max_workers=self.worker_count,
+            mp_context=multiprocessing.get_context('forkserver'),
+            initializer=os.nice,
+            initargs=(19,)
+        )
+        self._jobs.start(self.worker_count)
+        logger.info(
+            f"Image ingestion ready: {len(self.derivatives)} derivatives, "
+            f"{self._jobs.qsize()} queued"
+        )
+        
+    def _wanted_names(self) -> Dict[str, str]:
+        wanted = {}
+        for source in list(self.media_index.entries('pictures')):
+            try:
+                wanted[derivative_name(source, self.box)] = source
+            except OSError:
+                continue
+        return wanted
+        
+    def _on_media_change(self, change: MediaChange):
+        if change.kind != 'pictures' or not self._jobs.running:
+            return
+        
+        for source in change.removed + change.modified:
+            derivative = self.derivatives.pop(source, None)
+            if derivative:
+                remove_file(Path(derivative))
+        
+        for source in change.added + change.modified:
+            self._jobs.put(source)
+        
+    async def _ingest(self, source: str):
+        if not self.media_index.contains(source):
+            return
+        loop = asyncio.get_running_loop()
+        try:
+            self.derivatives[source] = await loop.run_in_executor(
+                self.executor, write_derivative, source, self.box, str(self.output_dir)
+            )
+        except FileNotFoundError:
+            # Deleted since it was queued; the media index reports that separately
+            pass
+        except Exception as e:
+            logger.warning(f"Could not ingest {source}: {e}")
+        
+    async def stop(self):
+        """Cancel pending ingestion and shut down the process pool"""
+        await self._jobs.stop()
+        
+        if self.executor:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
\ No newline at end of file
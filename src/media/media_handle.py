@@ -0,0 +1,14 @@
+from dataclasses import dataclass
+from typing import Any, Optional
+
+
+@dataclass
+class MediaHandle:
+    """A video prepared for playback, plus what probing learned about it"""
+    path: str
+    native: Any = None  # backend-specific media object, e.g. vlc.Media
+    parsed: bool = False
+    duration_ms: Optional[int] = None
+    codec: Optional[str] = None
+    width: Optional[int] = None
+    height: Optional[int] = None
\ No newline at end of file
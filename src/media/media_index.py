@@ -0,0 +1,302 @@
+import asyncio
+import logging
+import os
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+try:
+    from inotify_simple import INotify, flags
+    INOTIFY_AVAILABLE = True
+except ImportError:
+    logger.warning("inotify_simple not available, media index will poll")
+    INOTIFY_AVAILABLE = False
+
+VIDEO_EXTENSIONS = frozenset({'.mp4', '.avi', '.mkv', '.mov', '.wmv'})
+PICTURE_EXTENSIONS = frozenset({'.jpg', '.jpeg', '.png', '.bmp', '.gif'})
+
+# (size, mtime_ns) - enough to tell whether a file changed or is still growing
+Signature = Tuple[int, int]
+
+
+@dataclass
+class MediaChange:
+    """Files added, removed or modified in one media directory"""
+    kind: str  # "videos" or "pictures"
+    added: List[str] = field(default_factory=list)
+    removed: List[str] = field(default_factory=list)
+    modified: List[str] = field(default_factory=list)
+        
+    def __bool__(self):
+        return bool(self.added or self.removed or self.modified)
+
+
+def scan_directory(directory, extensions) -> Dict[str, Signature]:
+    """Single scandir pass returning path -> signature for matching media files"""
+    entries = {}
+    try:
+        with os.scandir(directory) as it:
+            for entry in it:
+                if entry.name.startswith('.'):
+                    continue
+                if os.path.splitext(entry.name)[1].lower() not in extensions:
+                    continue
+                try:
+                    if not entry.is_file():
+                        continue
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                entries[entry.path] = (stat.st_size, stat.st_mtime_ns)
+    except FileNotFoundError:
+        logger.warning(f"Media directory not found: {directory}")
+    return entries
+
+
+def _signature(path) -> Signature:
+    stat = os.stat(path)
+    return stat.st_size, stat.st_mtime_ns
+
+
+class MediaIndex:
+    """Shared index of video and picture files, kept current by inotify or polling
+
+    New and modified files are only indexed once their size and mtime have
+    been stable for media.upload_settle_time, so files still being copied over
+    SMB are never handed to the slideshow or player. Each indexed file costs
+    a path string and a signature, about 180 bytes, so this is the part of
+    the slideshow's memory that still grows with the library (see
+    scripts/bench_slideshow_memory.py).
+    """
+        
+    def __init__(self, settings):
+        self.settings = settings
+        
+        self.directories = {
+            'videos': str(Path(settings.media.videos_dir).resolve()),
+            'pictures': str(Path(settings.media.pictures_dir).resolve()),
+        }
+        self.extensions = {
+            'videos': VIDEO_EXTENSIONS,
+            'pictures': PICTURE_EXTENSIONS,
+        }
+        
+        self.settle_time = settings.media.upload_settle_time
+        self.poll_interval = settings.media.rescan_interval
+        
+        self._entries: Dict[str, Dict[str, Signature]] = {kind: {} for kind in self.directories}
+        self._settling = {}  # path -> (TimerHandle, signature when scheduled)
+        self._outbox: Dict[str, MediaChange] = {}
+        self._listeners: List[Callable] = []
+        
+        self._loop = None
+        self._inotify = None
+        self._watches = {}  # watch descriptor -> kind
+        self._poll_task = None
+        
+    def files(self, kind: str) -> List[str]:
+        """Sorted paths of all indexed files of a kind"""
+        return sorted(self._entries[kind])
+        
+    def entries(self, kind: str) -> Dict[str, Signature]:
+        """Indexed path -> (size, mtime_ns) for a kind; do not modify"""
+        return self._entries[kind]
+        
+    def contains(self, path) -> bool:
+        """Check whether a path is indexed"""
+        path = str(path)
+        return any(path in entries for entries in self._entries.values())
+        
+    def subscribe(self, callback: Callable):
+        """Register callback(change); coroutine callbacks are scheduled as tasks"""
+        self._listeners.append(callback)
+        
+    async def scan(self, settle: bool = False):
+        """Full rescan of all directories, off the event loop"""
+        loop = asyncio.get_running_loop()
+        for kind, directory in self.directories.items():
+            entries = await loop.run_in_executor(
+                None, scan_directory, directory, self.extensions[kind]
+            )
+            self._apply_scan(kind, entries, settle)
+        
+        self._flush()
+        logger.info(
+            f"Indexed {len(self._entries['videos'])} videos, "
+            f"{len(self._entries['pictures'])} pictures"
+        )
+        
+    async def start(self):
+        """Begin following directory changes"""
+        self._loop = asyncio.get_running_loop()
+        
+        if INOTIFY_AVAILABLE:
+            try:
+                self._start_inotify()
+                logger.info("Media index following changes via inotify")
+                return
+            except OSError as e:
+                logger.warning(f"inotify unavailable ({e}), falling back to polling")
+                self._stop_inotify()
+        
+        self._poll_task = asyncio.create_task(self._poll())
+        logger.info(f"Media index polling every {self.poll_interval}s")
+        
+    def _start_inotify(self):
+        self._inotify = INotify()
+        mask = (flags.CLOSE_WRITE | flags.CREATE | flags.MODIFY | flags.ATTRIB |
+                flags.MOVED_TO | flags.MOVED_FROM | flags.DELETE)
+        
+        for kind, directory in self.directories.items():
+            wd = self._inotify.add_watch(directory, mask)
+            self._watches[wd] = kind
+        
+        self._loop.add_reader(self._inotify.fileno(), self._on_inotify)
+        
+    def _stop_inotify(self):
+        if self._inotify:
+            if self._loop:
+                self._loop.remove_reader(self._inotify.fileno())
+            self._inotify.close()
+            self._inotify = None
+        self._watches.clear()
+        
+    def _on_inotify(self):
+        """Translate inotify events into index updates"""
+        try:
+            events = self._inotify.read(timeout=0)
+        except OSError as e:
+            logger.error(f"inotify read failed: {e}")
+            return
+        
+        for event in events:
+            if event.mask & flags.Q_OVERFLOW:
+                logger.warning("inotify queue overflowed, rescanning")
+                asyncio.create_task(self.scan(settle=True))
+                return
+            
+            kind = self._watches.get(event.wd)
+            if kind is None or not event.name or event.name.startswith('.'):
+                continue
+            if os.path.splitext(event.name)[1].lower() not in self.extensions[kind]:
+                continue
+            
+            path = os.path.join(self.directories[kind], event.name)
+            if event.mask & (flags.DELETE | flags.MOVED_FROM):
+                self._remove(kind, path)
+            else:
+                self._schedule_settle(kind, path)
+        
+        self._flush()
+        
+    async def _poll(self):
+        """Polling fallback when inotify is unavailable"""
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            for kind, directory in self.directories.items():
+                try:
+                    entries = await loop.run_in_executor(
+                        None, scan_directory, directory, self.extensions[kind]
+                    )
+                except Exception as e:
+                    logger.error(f"Media rescan failed: {e}")
+                    continue
+                self._apply_scan(kind, entries, settle=True)
+            self._flush()
+        
+    def _apply_scan(self, kind: str, entries: Dict[str, Signature], settle: bool):
+        """Diff a directory scan against the index"""
+        current = self._entries[kind]
+        
+        for path in list(current):
+            if path not in entries:
+                self._remove(kind, path)
+        
+        for path, signature in entries.items():
+            if current.get(path) == signature:
+                continue
+            if settle:
+                self._schedule_settle(kind, path)
+            else:
+                self._commit(kind, path, signature)
+        
+    def _schedule_settle(self, kind: str, path: str):
+        """(Re)start the quiet period a file must pass before it is indexed"""
+        try:
+            signature = _signature(path)
+        except OSError:
+            return
+        
+        pending = self._settling.get(path)
+        if pending:
+            if pending[1] == signature:
+                # Unchanged since the quiet period started; let it run out
+                return
+            pending[0].cancel()
+        
+        timer = self._loop.call_later(
+            self.settle_time, self._check_settled, kind, path, signature
+        )
+        self._settling[path] = (timer, signature)
+        
+    def _check_settled(self, kind: str, path: str, signature: Signature):
+        self._settling.pop(path, None)
+        try:
+            latest = _signature(path)
+        except OSError:
+            return
+        
+        if latest != signature:
+            # Still being written
+            self._schedule_settle(kind, path)
+            return
+        
+        self._commit(kind, path, latest)
+        self._flush()
+        
+    def _commit(self, kind: str, path: str, signature: Signature):
+        current = self._entries[kind]
+        change = self._outbox.setdefault(kind, MediaChange(kind))
+        if path in current:
+            change.modified.append(path)
+        else:
+            change.added.append(path)
+        current[path] = signature
+        
+    def _remove(self, kind: str, path: str):
+        pending = self._settling.pop(path, None)
+        if pending:
+            pending[0].cancel()
+        if self._entries[kind].pop(path, None) is not None:
+            self._outbox.setdefault(kind, MediaChange(kind)).removed.append(path)
+        
+    def _flush(self):
+        """Deliver accumulated changes to subscribers"""
+        outbox, self._outbox = self._outbox, {}
+        for change in outbox.values():
+            if not change:
+                continue
+            logger.info(
+                f"Media {change.kind}: +{len(change.added)} -{len(change.removed)} "
+                f"~{len(change.modified)}"
+            )
+            for callback in self._listeners:
+                try:
+                    result = callback(change)
+                    if asyncio.iscoroutine(result):
+                        asyncio.create_task(result)
+                except Exception as e:
+                    logger.error(f"Media change listener failed: {e}")
+        
+    async def stop(self):
+        """Stop following changes"""
+        self._stop_inotify()
+        if self._poll_task:
+            self._poll_task.cancel()
+            self._poll_task = None
+        for timer, _ in self._settling.values():
+            timer.cancel()
+        self._settling.clear()
\ No newline at end of file
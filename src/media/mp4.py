@@ -0,0 +1,42 @@
+import struct
+from typing import Iterator, Tuple
+
+# (type, offset, size) of one top-level ISO BMFF box
+Box = Tuple[str, int, int]
+
+
+def top_level_boxes(path) -> Iterator[Box]:
+    """Walk the top-level boxes of an MP4/MOV file, reading only their headers"""
+    with open(path, 'rb') as f:
+        f.seek(0, 2)
+        file_size = f.tell()
+        offset = 0
+        while offset + 8 <= file_size:
+            f.seek(offset)
+            size, box_type = struct.unpack('>I4s', f.read(8))
+            if size == 1:
+                size = struct.unpack('>Q', f.read(8))[0]
+            elif size == 0:
+                size = file_size - offset
+            if size < 8:
+                return
+            yield box_type.decode('latin-1'), offset, size
+            offset += size
+
+
+def find_box(path, box_type: str):
+    """(offset, size) of the first top-level box of a type, or None"""
+    try:
+        for found, offset, size in top_level_boxes(path):
+            if found == box_type:
+                return offset, size
+    except (OSError, struct.error):
+        pass
+    return None
+
+
+def is_faststart(path) -> bool:
+    """True when the moov index precedes the media data, so playback starts without seeking to the end"""
+    moov = find_box(path, 'moov')
+    mdat = find_box(path, 'mdat')
+    return moov is not None and (mdat is None or moov[0] < mdat[0])
\ No newline at end of file
@@ -0,0 +1,69 @@
+import bisect
+import heapq
+import os
+from array import array
+from typing import Iterable, Iterator
+
+
+class PathTable:
+    """Sorted, immutable sequence of paths packed into a single byte blob
+
+    Each path costs its encoded length plus one 8-byte offset, instead of a
+    str or Path object apiece, so very large libraries stay small in memory.
+    Changes produce a new table, which callers swap in with one assignment.
+    """
+    __slots__ = ('_blob', '_offsets')
+        
+    def __init__(self, sorted_paths: Iterable[str] = ()):
+        blob = bytearray()
+        offsets = array('Q', [0])
+        previous = None
+        for path in sorted_paths:
+            path = str(path)
+            if path == previous:
+                continue
+            blob += os.fsencode(path)
+            offsets.append(len(blob))
+            previous = path
+        self._blob = bytes(blob)
+        self._offsets = offsets
+        
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+        
+    def __getitem__(self, index: int) -> str:
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("path table index out of range")
+        return os.fsdecode(self._blob[self._offsets[index]:self._offsets[index + 1]])
+        
+    def __iter__(self) -> Iterator[str]:
+        for index in range(len(self)):
+            yield self[index]
+        
+    def __contains__(self, path) -> bool:
+        return self.find(path) >= 0
+        
+    def find(self, path) -> int:
+        """Index of a path, or -1; binary search over the packed entries"""
+        path = str(path)
+        index = bisect.bisect_left(self, path)
+        if index < len(self) and self[index] == path:
+            return index
+        return -1
+        
+    def insertion_point(self, path) -> int:
+        """Index the path would occupy if it were added"""
+        return bisect.bisect_left(self, str(path))
+        
+    def merged(self, added: Iterable[str] = (), removed: Iterable[str] = ()) -> "PathTable":
+        """New table with paths added and removed, built in one streaming pass"""
+        removed = set(map(str, removed))
+        kept = (path for path in self if path not in removed)
+        return PathTable(heapq.merge(kept, sorted(map(str, added))))
+        
+    @property
+    def nbytes(self) -> int:
+        """Approximate memory held by the packed data"""
+        return len(self._blob) + self._offsets.itemsize * len(self._offsets)
\ No newline at end of file
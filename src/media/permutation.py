@@ -0,0 +1,66 @@
+import random
+from typing import Optional
+
+
+class FeistelPermutation:
+    """Pseudo-random bijection on range(size) that needs O(1) memory
+
+    A balanced Feistel network permutes the smallest even-bit power of two
+    covering size; indices that land outside range(size) are re-encrypted
+    (cycle walking) until they fall inside. Because the network can be run
+    backwards, position_of() finds where an item sits in the order without
+    materializing it.
+    """
+        
+    ROUNDS = 4
+        
+    def __init__(self, size: int, seed: Optional[int] = None):
+        self.size = size
+        bits = max(2, (size - 1).bit_length())
+        bits += bits % 2
+        self._half_bits = bits // 2
+        self._mask = (1 << self._half_bits) - 1
+        
+        rng = random.Random(seed)
+        self._keys = [rng.getrandbits(32) for _ in range(self.ROUNDS)]
+        
+    def __len__(self) -> int:
+        return self.size
+        
+    def _round(self, value: int, key: int) -> int:
+        # 32-bit integer mix (murmur3 finalizer)
+        x = (value * 0x9E3779B1 + key) & 0xFFFFFFFF
+        x ^= x >> 16
+        x = (x * 0x85EBCA6B) & 0xFFFFFFFF
+        x ^= x >> 13
+        return x & self._mask
+        
+    def _encrypt(self, value: int) -> int:
+        left, right = value >> self._half_bits, value & self._mask
+        for key in self._keys:
+            left, right = right, left ^ self._round(right, key)
+        return (left << self._half_bits) | right
+        
+    def _decrypt(self, value: int) -> int:
+        left, right = value >> self._half_bits, value & self._mask
+        for key in reversed(self._keys):
+            left, right = right ^ self._round(left, key), left
+        return (left << self._half_bits) | right
+        
+    def __getitem__(self, position: int) -> int:
+        """Item shown at a position in the shuffled order"""
+        if not 0 <= position < self.size:
+            raise IndexError("permutation index out of range")
+        value = self._encrypt(position)
+        while value >= self.size:
+            value = self._encrypt(value)
+        return value
+        
+    def position_of(self, item: int) -> int:
+        """Inverse: the position at which an item appears"""
+        if not 0 <= item < self.size:
+            raise IndexError("permutation item out of range")
+        value = self._decrypt(item)
+        while value >= self.size:
+            value = self._decrypt(value)
+        return value
\ No newline at end of file
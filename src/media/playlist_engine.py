@@ -0,0 +1,262 @@
+import logging
+import random
+from collections import deque
+from dataclasses import dataclass
+from datetime import datetime, time as day_time
+from pathlib import Path
+from typing import Deque, Dict, Iterator, List, Optional, Tuple
+
+from .media_index import PICTURE_EXTENSIONS, VIDEO_EXTENSIONS
+from .permutation import FeistelPermutation
+
+logger = logging.getLogger(__name__)
+
+PLAYLIST_ORDERS = ("ordered", "shuffle", "weighted")
+WEEKDAYS = ("mon", "tue", "wed", "thu", "fri", "sat", "sun")
+
+
+@dataclass(frozen=True)
+class PlaylistEntry:
+    """One file of a playlist as configured, before it is looked up"""
+    file: str
+    kind: str  # "videos" or "pictures"
+    duration: Optional[float] = None  # seconds on screen; pictures only
+    weight: float = 1.0
+
+
+@dataclass(frozen=True)
+class PlaylistItem:
+    """An entry resolved to a file that exists"""
+    path: str
+    kind: str
+    duration: Optional[float] = None
+
+
+@dataclass(frozen=True)
+class ScheduleWindow:
+    """Time of day a playlist is active; an end before the start runs past midnight"""
+    start: day_time
+    end: day_time
+    days: Tuple[int, ...] = ()  # weekdays the window starts on, Monday = 0; empty for every day
+        
+    def contains(self, now: datetime) -> bool:
+        moment = now.time()
+        weekday = now.weekday()
+        if self.start < self.end:
+            inside = self.start <= moment < self.end
+        elif moment >= self.start:
+            inside = True
+        else:
+            # Early-morning part of a window that started the previous day
+            inside = moment < self.end
+            weekday = (weekday - 1) % 7
+        return inside and (not self.days or weekday in self.days)
+
+
+@dataclass(frozen=True)
+class Playlist:
+    name: str
+    entries: Tuple[PlaylistEntry, ...]
+    order: str = "ordered"
+    schedule: Tuple[ScheduleWindow, ...] = ()
+
+
+def _kind_of(file_name: str) -> str:
+    suffix = Path(file_name).suffix.lower()
+    if suffix in VIDEO_EXTENSIONS:
+        return "videos"
+    if suffix in PICTURE_EXTENSIONS:
+        return "pictures"
+    raise ValueError(f"{file_name} is neither a picture nor a video")
+
+
+def _seconds(value, what: str) -> float:
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or value <= 0:
+        raise ValueError(f"{what} must be a positive number of seconds, not {value!r}")
+    return float(value)
+
+
+def _clock(value: str, what: str) -> day_time:
+    try:
+        return day_time.fromisoformat(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{what} must be a time like 09:30, not {value!r}") from None
+
+
+def parse_playlist(name: str, spec: Dict) -> Playlist:
+    """Validate one playlist from playlists.json; raises ValueError
+
+    "items" lists file names, or objects with a "file" and optionally a
+    "duration" and a "weight". The older "pictures" and "videos" lists are
+    appended to them.
+    """
+    if not isinstance(spec, dict):
+        raise ValueError(f"playlist {name} must be an object")
+    for key in ("items", "pictures", "videos", "schedule"):
+        if not isinstance(spec.get(key, []), list):
+            raise ValueError(f"playlist {name}: {key} must be a list")
+        
+    default_duration = spec.get("duration")
+    if default_duration is not None:
+        default_duration = _seconds(default_duration, f"playlist {name}: duration")
+    
+    entries = []
+    for item in spec.get("items", []):
+        if isinstance(item, str):
+            item = {"file": item}
+        if not isinstance(item, dict) or not isinstance(item.get("file"), str):
+            raise ValueError(f"playlist {name}: each item needs a file name")
+        file_name = item["file"]
+        duration = item.get("duration", default_duration)
+        entries.append(PlaylistEntry(
+            file_name,
+            _kind_of(file_name),
+            None if duration is None else _seconds(duration, f"playlist {name}: {file_name} duration"),
+            _seconds(item.get("weight", 1), f"playlist {name}: {file_name} weight"),
+        ))
+    for kind in ("pictures", "videos"):
+        for file_name in spec.get(kind, []):
+            if not isinstance(file_name, str):
+                raise ValueError(f"playlist {name}: {kind} must be a list of file names")
+            entries.append(PlaylistEntry(file_name, kind, default_duration))
+    
+    order = spec.get("order", "ordered")
+    if order not in PLAYLIST_ORDERS:
+        raise ValueError(f"playlist {name}: order must be one of {', '.join(PLAYLIST_ORDERS)}")
+    
+    windows = []
+    for window in spec.get("schedule", []):
+        if not isinstance(window, dict):
+            raise ValueError(f"playlist {name}: each schedule entry must be an object")
+        days = window.get("days", [])
+        if not isinstance(days, list) or any(day not in WEEKDAYS for day in days):
+            raise ValueError(f"playlist {name}: days must be a list of {', '.join(WEEKDAYS)}")
+        start = _clock(window.get("start"), f"playlist {name}: start")
+        end = _clock(window.get("end"), f"playlist {name}: end")
+        if start == end:
+            raise ValueError(f"playlist {name}: schedule window starts and ends at {start}")
+        windows.append(ScheduleWindow(start, end, tuple(WEEKDAYS.index(day) for day in days)))
+    
+    return Playlist(name, tuple(entries), order, tuple(windows))
+
+
+class PlaylistCursor:
+    """Position in a lazy playlist sequence, with a short look-ahead for prefetching"""
+        
+    def __init__(self, name: str, items: Iterator[PlaylistItem]):
+        self.name = name
+        self._items = items
+        self._ahead: Deque[PlaylistItem] = deque()
+        self.exhausted = False
+        
+    def peek(self, count: int) -> List[PlaylistItem]:
+        """The current item and the ones after it, resolving no more than count"""
+        while len(self._ahead) < count and not self.exhausted:
+            item = next(self._items, None)
+            if item is None:
+                self.exhausted = True
+            else:
+                self._ahead.append(item)
+        return list(self._ahead)[:count]
+        
+    @property
+    def current(self) -> Optional[PlaylistItem]:
+        ahead = self.peek(1)
+        return ahead[0] if ahead else None
+        
+    def advance(self):
+        if self._ahead:
+            self._ahead.popleft()
+
+
+class PlaylistEngine:
+    """Turns playlists.json into the sequence of pictures and videos to show
+
+    The playlist to play is the first one whose schedule covers the current
+    time, else the first unscheduled one with entries. Its sequence is an
+    endless generator that looks each entry up in the media catalog only
+    when it is about to be shown, skipping files that are not there; a pass
+    in which nothing could be found ends the sequence, and the slideshow
+    falls back to the whole picture library.
+    """
+        
+    def __init__(self, playlist_manager, catalog=None):
+        self.playlist_manager = playlist_manager
+        self.catalog = catalog
+        
+        self.renditions = None  # as ButtonMapper.renditions
+        
+        self._reported_missing = set()
+        
+    def active_playlist(self, now: Optional[datetime] = None) -> Optional[Playlist]:
+        """Playlist that should be playing now, or None for the picture library"""
+        now = now or datetime.now()
+        playlists = [p for p in self.playlist_manager.compiled.values() if p.entries]
+        for playlist in playlists:
+            if any(window.contains(now) for window in playlist.schedule):
+                return playlist
+        return next((playlist for playlist in playlists if not playlist.schedule), None)
+        
+    def cursor(self, playlist: Playlist) -> PlaylistCursor:
+        return PlaylistCursor(playlist.name, self.sequence(playlist))
+        
+    def sequence(self, playlist: Playlist) -> Iterator[PlaylistItem]:
+        """Endless sequence of a playlist's files in its configured order"""
+        if playlist.order == "weighted":
+            yield from self._weighted(playlist)
+            return
+        
+        entries = playlist.entries
+        while True:
+            found = False
+            if playlist.order == "shuffle":
+                order = FeistelPermutation(len(entries), random.getrandbits(64))
+                passes = (entries[order[position]] for position in range(len(entries)))
+            else:
+                passes = iter(entries)
+            for entry in passes:
+                item = self._resolve(entry)
+                if item:
+                    found = True
+                    yield item
+            if not found:
+                logger.warning(f"Nothing in playlist {playlist.name} is available")
+                return
+        
+    def _weighted(self, playlist: Playlist) -> Iterator[PlaylistItem]:
+        entries = list(playlist.entries)
+        previous = None
+        while True:
+            # A round is as many draws as there are entries; missing files
+            # are left out for the rest of the round, then retried
+            candidates = list(entries)
+            found = False
+            for _ in range(len(entries)):
+                if not candidates:
+                    break
+                # Never the same file twice in a row when there is a choice
+                choices = [entry for entry in candidates if entry is not previous] or candidates
+                entry = random.choices(choices, weights=[entry.weight for entry in choices])[0]
+                item = self._resolve(entry)
+                if item is None:
+                    candidates.remove(entry)
+                    continue
+                found = True
+                previous = entry
+                yield item
+            if not found:
+                logger.warning(f"Nothing in playlist {playlist.name} is available")
+                return
+        
+    def _resolve(self, entry: PlaylistEntry) -> Optional[PlaylistItem]:
+        path = self.catalog.find_by_name(entry.kind, entry.file) if self.catalog else None
+        if path is None:
+            if entry.file not in self._reported_missing:
+                self._reported_missing.add(entry.file)
+                logger.warning(f"Playlist file {entry.file} is not in the media catalog, skipping")
+            return None
+        self._reported_missing.discard(entry.file)
+        
+        if entry.kind == "videos" and self.renditions:
+            path = self.renditions.rendition_for(path) or path
+        return PlaylistItem(path, entry.kind, entry.duration)
\ No newline at end of file
@@ -3,66 +3,132 @@ import logging
 from pathlib import Path
 from typing import Dict, List
 
+from config.persistence import DeferredWriter, read_with_backup
+
+from .playlist_engine import Playlist, parse_playlist
+
 logger = logging.getLogger(__name__)
 
 
+def read_playlists_file(path) -> Dict[str, Dict]:
+    """Parse and validate a playlists file; raises ValueError or OSError"""
+    with open(path, 'r') as f:
+        try:
+            data = json.load(f)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"not valid JSON: {e}") from e
+            
+    playlists = data.get('playlists') if isinstance(data, dict) else None
+    if not isinstance(playlists, dict):
+        raise ValueError("expected an object with a \"playlists\" object")
+    for name, playlist in playlists.items():
+        parse_playlist(name, playlist)
+    return playlists
+
+
 class PlaylistManager:
-    def __init__(self, settings):
+    def __init__(self, settings, catalog=None):
         self.settings = settings
+        self.catalog = catalog
         self.playlists = {}
         
+        # Validated form of each playlist, for media.playlist_engine
+        self.compiled: Dict[str, Playlist] = {}
+        
+        # Batches saves from successive add/remove calls into one write
+        self._writer = DeferredWriter(
+            lambda: self.settings.config.playlists_file,
+            lambda: json.dumps({'playlists': self.playlists}, indent=2),
+            validate=read_playlists_file,
+            description="playlists"
+        )
+        
     async def load_playlists(self):
         """Load playlist configurations"""
         playlist_file = Path(self.settings.config.playlists_file)
         
-        if playlist_file.exists():
-            try:
-                with open(playlist_file, 'r') as f:
-                    data = json.load(f)
-                    self.playlists = data.get('playlists', {})
-                    logger.info(f"Loaded {len(self.playlists)} playlists")
-            except Exception as e:
-                logger.error(f"Failed to load playlists: {e}")
-                self.create_default_playlists()
-        else:
+        try:
+            self._set_playlists(read_with_backup(playlist_file, read_playlists_file))
+            logger.info(f"Loaded {len(self.playlists)} playlists")
+        except FileNotFoundError:
+            self.create_default_playlists()
+        except Exception as e:
+            logger.error(f"Failed to load playlists: {e}")
             self.create_default_playlists()
             
+    def reload(self) -> List[str]:
+        """Re-read an edited playlists file; returns the names that changed
+
+        A file that fails to parse or validate is logged and ignored, keeping
+        the playlists in use.
+        """
+        playlist_file = self.settings.config.playlists_file
+        try:
+            playlists = read_playlists_file(playlist_file)
+        except (OSError, ValueError) as e:
+            logger.error(f"Keeping current playlists, {playlist_file} is invalid: {e}")
+            return []
+            
+        changed = sorted(
+            name for name in set(playlists) | set(self.playlists)
+            if playlists.get(name) != self.playlists.get(name)
+        )
+        if changed:
+            self._set_playlists(playlists)
+            logger.info(f"Playlists reloaded, changed: {', '.join(changed)}")
+        return changed
+        
+    def _set_playlists(self, playlists: Dict[str, Dict]):
+        # Both in one step, so the engine never pairs old and new playlists
+        compiled = {name: parse_playlist(name, playlist) for name, playlist in playlists.items()}
+        self.playlists, self.compiled = playlists, compiled
+        
     def create_default_playlists(self):
         """Create default playlists"""
-        self.playlists = {
+        self._set_playlists({
             "default": {
                 "name": "Default Playlist",
                 "videos": [],
                 "pictures": []
             }
-        }
+        })
         logger.info("Created default playlists")
         
     def get_playlist(self, name: str) -> Dict:
         """Get a specific playlist"""
         return self.playlists.get(name, {})
         
+    def get_playlist_files(self, name: str) -> Dict[str, List[str]]:
+        """Resolve a playlist's file names to catalogued paths, skipping missing ones"""
+        playlist = self.get_playlist(name)
+        resolved = {'videos': [], 'pictures': []}
+        if not self.catalog:
+            return resolved
+            
+        for kind in resolved:
+            for file_name in playlist.get(kind, []):
+                path = self.catalog.find_by_name(kind, file_name)
+                if path:
+                    resolved[kind].append(path)
+                else:
+                    logger.warning(f"Playlist {name}: {file_name} not in media catalog")
+        return resolved
+        
     def add_playlist(self, name: str, playlist_data: Dict):
-        """Add or update a playlist"""
-        self.playlists[name] = playlist_data
+        """Add or update a playlist; raises ValueError if it is invalid"""
+        self._set_playlists({**self.playlists, name: playlist_data})
         self.save_playlists()
         
     def remove_playlist(self, name: str):
         """Remove a playlist"""
         if name in self.playlists:
-            del self.playlists[name]
+            self._set_playlists({key: value for key, value in self.playlists.items() if key != name})
             self.save_playlists()
             
     def save_playlists(self):
-        """Save playlists to file"""
-        playlist_file = Path(self.settings.config.playlists_file)
+        """Save playlists to file, batched with any further changes"""
+        self._writer.save()
         
-        try:
-            playlist_file.parent.mkdir(parents=True, exist_ok=True)
-            
-            with open(playlist_file, 'w') as f:
-                json.dump({'playlists': self.playlists}, f, indent=2)
-                
-            logger.info("Playlists saved")
-        except Exception as e:
-            logger.error(f"Failed to save playlists: {e}")
\ No newline at end of file
+    def flush(self):
+        """Write a pending save now"""
+        self._writer.flush()
\ No newline at end of file
@@ -0,0 +1,283 @@
+import asyncio
+import ctypes
+import ctypes.util
+import logging
+import mmap
+import os
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+from .mp4 import find_box
+
+logger = logging.getLogger(__name__)
+
+MB = 1024 * 1024
+READ_CHUNK = MB
+
+# The kernel caps how much one WILLNEED hint reads ahead, so longer ranges
+# are advised piece by piece
+ADVICE_CHUNK = 2 * MB
+
+# Byte ranges of a file, as (offset, length)
+Ranges = List[Tuple[int, int]]
+
+# Maps each mincore() status byte to 1 if its page is resident, else 0
+_RESIDENT = bytes(value & 1 for value in range(256))
+
+
+@dataclass(frozen=True)
+class Residency:
+    """How much of one video the page cache holds"""
+    path: str
+    size: int
+    warm_bytes: int  # head of the file plus a trailing moov index
+    warm_cached: Optional[int]  # of warm_bytes, how many are in the page cache; None if unknown
+        
+    @property
+    def warm_fraction(self) -> Optional[float]:
+        if self.warm_cached is None:
+            return None
+        return self.warm_cached / self.warm_bytes if self.warm_bytes else 1.0
+
+
+class _Libc:
+    """mmap/mincore/munmap through ctypes, as the mmap module exposes no address"""
+        
+    def __init__(self):
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        # mmap() takes a 32-bit offset on 32-bit Pi OS, which would wrap past
+        # 2 GiB; mmap64() takes a 64-bit one everywhere
+        if hasattr(libc, "mmap64"):
+            self.mmap = libc.mmap64
+        elif ctypes.sizeof(ctypes.c_long) == 8:
+            self.mmap = libc.mmap
+        else:
+            raise AttributeError("no mmap64 in libc")
+        self.mmap.restype = ctypes.c_void_p
+        self.mmap.argtypes = [ctypes.c_void_p, ctypes.c_size_t, ctypes.c_int,
+                              ctypes.c_int, ctypes.c_int, ctypes.c_int64]
+        self.mincore = libc.mincore
+        self.mincore.restype = ctypes.c_int
+        self.mincore.argtypes = [ctypes.c_void_p, ctypes.c_size_t, ctypes.c_char_p]
+        self.munmap = libc.munmap
+        self.munmap.restype = ctypes.c_int
+        self.munmap.argtypes = [ctypes.c_void_p, ctypes.c_size_t]
+
+
+@lru_cache(maxsize=None)
+def _get_libc() -> Optional[_Libc]:
+    try:
+        return _Libc()
+    except (OSError, AttributeError) as e:
+        logger.debug(f"mincore unavailable, page cache residency not reported: {e}")
+        return None
+
+
+def page_map(fd: int, offset: int, length: int) -> Optional[bytes]:
+    """One byte per page of a range of a file, 1 where the page is in the page cache
+
+    Maps only that range, without touching it, so asking does not pull
+    anything in. None where mincore() is unavailable; raises OSError if the
+    range cannot be mapped.
+    """
+    libc = _get_libc()
+    if libc is None:
+        return None
+    # mmap() offsets must be page aligned
+    start = offset - offset % mmap.PAGESIZE
+    span = length + offset - start
+    pages = (span + mmap.PAGESIZE - 1) // mmap.PAGESIZE
+    if not pages:
+        return b""
+    
+    address = libc.mmap(None, span, mmap.PROT_READ, mmap.MAP_SHARED, fd, start)
+    if address in (None, ctypes.c_void_p(-1).value):
+        raise OSError(ctypes.get_errno(), "mmap failed")
+    try:
+        vector = ctypes.create_string_buffer(pages)
+        if libc.mincore(address, span, vector) != 0:
+            raise OSError(ctypes.get_errno(), "mincore failed")
+        return vector.raw.translate(_RESIDENT)
+    finally:
+        libc.munmap(address, span)
+
+
+def cached_bytes(fd: int, ranges: Ranges) -> Optional[int]:
+    """Bytes of the ranges held in the page cache, to page granularity
+
+    None where mincore() is unavailable; raises OSError if a range cannot
+    be mapped.
+    """
+    total = 0
+    for offset, length in ranges:
+        pages = page_map(fd, offset, length)
+        if pages is None:
+            return None
+        total += min(pages.count(1) * mmap.PAGESIZE, length)
+    return total
+
+
+def warm_ranges(path: str, size: int, head_bytes: int) -> Ranges:
+    """The parts of a video a player reads before the first frame
+
+    That is the start of the file and, for files not written faststart, the
+    moov index at the end.
+    """
+    ranges = [(0, min(size, head_bytes))]
+    moov = find_box(path, 'moov')
+    if moov:
+        offset, length = moov
+        if offset + length > head_bytes:
+            start = max(offset, head_bytes)
+            ranges.append((start, min(offset + length, size) - start))
+    return [(offset, length) for offset, length in ranges if length > 0]
+
+
+def advise_willneed(fd: int, ranges: Ranges):
+    """Have the kernel read ranges into the page cache in the background"""
+    if hasattr(os, "posix_fadvise"):
+        for offset, length in ranges:
+            for start in range(offset, offset + length, ADVICE_CHUNK):
+                os.posix_fadvise(fd, start, min(ADVICE_CHUNK, offset + length - start),
+                                 os.POSIX_FADV_WILLNEED)
+        return
+    # Reading synchronously has the same effect, only slower
+    for offset, length in ranges:
+        os.lseek(fd, offset, os.SEEK_SET)
+        remaining = length
+        while remaining > 0:
+            chunk = os.read(fd, min(READ_CHUNK, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+
+
+def memory_available() -> Optional[int]:
+    """MemAvailable from /proc/meminfo in bytes, or None if unknown"""
+    try:
+        with open("/proc/meminfo") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+
+class VideoPrewarmer:
+    """Keeps the start of every button's video in the page cache
+
+    A first press after boot or a long idle would otherwise wait on the SD
+    card for the MP4 header and first GOP. Each pass measures how much of
+    those ranges is still cached, asks the kernel to read back what was
+    evicted, and logs the residency per video. Videos are warmed in button
+    order and only while MemAvailable stays above prewarm_reserve_mb, so
+    warming never pushes the kiosk itself into reclaim.
+    """
+        
+    def __init__(self, settings, button_mapper):
+        self.settings = settings
+        self.button_mapper = button_mapper
+        
+        self.enabled = settings.media.prewarm_enabled
+        self.head_bytes = settings.media.prewarm_head_mb * MB
+        self.interval = settings.media.prewarm_interval
+        self.reserve = settings.media.prewarm_reserve_mb * MB
+        
+        # Video path -> residency found by the last pass, before warming
+        self.residency: Dict[str, Residency] = {}
+        
+        self._wake = asyncio.Event()
+        self._task = None
+        
+    async def start(self):
+        if not self.enabled or self._task is not None:
+            return
+        self._task = asyncio.create_task(self._run())
+        
+    def request(self):
+        """Warm again soon, e.g. after the mapped videos changed"""
+        self._wake.set()
+        
+    async def _run(self):
+        while True:
+            self._wake.clear()
+            try:
+                await self.warm()
+            except Exception as e:
+                logger.error(f"Video prewarm failed: {e}")
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+        
+    async def warm(self) -> Dict[str, Residency]:
+        """One pass over the mapped videos; returns their residency beforehand"""
+        videos = self.button_mapper.get_mapped_videos()
+        self.residency = await asyncio.to_thread(self._warm_all, videos)
+        self._log_report()
+        return self.residency
+        
+    def _warm_all(self, videos: List[str]) -> Dict[str, Residency]:
+        available = memory_available()
+        budget = None if available is None else max(0, available - self.reserve)
+        
+        found = {}
+        for video in videos:
+            try:
+                fd = os.open(video, os.O_RDONLY)
+            except OSError as e:
+                logger.warning(f"Cannot prewarm {video}: {e}")
+                continue
+            try:
+                size = os.fstat(fd).st_size
+                ranges = warm_ranges(video, size, self.head_bytes)
+                warm_bytes = sum(length for _, length in ranges)
+                try:
+                    warm_cached = cached_bytes(fd, ranges)
+                except OSError as e:
+                    # Only the report suffers; warm as if nothing were cached
+                    logger.warning(f"Page cache residency of {video} unknown, warming anyway: {e}")
+                    warm_cached = None
+                residency = Residency(video, size, warm_bytes, warm_cached)
+                found[video] = residency
+                
+                missing = warm_bytes - (warm_cached or 0)
+                if missing <= 0:
+                    continue
+                if budget is not None:
+                    if missing > budget:
+                        logger.warning(
+                            f"Not prewarming {os.path.basename(video)}: "
+                            f"{missing / MB:.0f} MB would dip into the memory reserve"
+                        )
+                        continue
+                    budget -= missing
+                advise_willneed(fd, ranges)
+            except OSError as e:
+                logger.warning(f"Cannot prewarm {video}: {e}")
+            finally:
+                os.close(fd)
+        return found
+        
+    def _log_report(self):
+        if not self.residency:
+            return
+        known = [r for r in self.residency.values() if r.warm_cached is not None]
+        warm = sum(r.warm_bytes for r in known)
+        cached = sum(r.warm_cached for r in known)
+        details = ", ".join(
+            f"{os.path.basename(r.path)} "
+            + (f"{r.warm_fraction:.0%}" if r.warm_cached is not None else "unknown")
+            + f" of {r.warm_bytes / MB:.0f} MB ({r.size / MB:.0f} MB file)"
+            for r in self.residency.values()
+        )
+        logger.info(
+            f"Video prewarm: {cached / MB:.0f}/{warm / MB:.0f} MB of video heads were cached; {details}"
+        )
+        
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
\ No newline at end of file
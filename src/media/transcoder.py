@@ -0,0 +1,215 @@
+import asyncio
+import hashlib
+import logging
+import os
+import shutil
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from .catalog import MediaCatalog, probe_video
+from .derived_files import JobQueue, adopt_outputs, remove_file
+from .media_index import MediaChange, MediaIndex
+from .mp4 import is_faststart
+
+logger = logging.getLogger(__name__)
+
+RENDITION_SUFFIX = ".mp4"
+PASSTHROUGH_CONTAINERS = frozenset({'.mp4', '.m4v'})
+
+# Seconds between forced keyframes; a fixed GOP keeps seeks and restarts fast
+KEYFRAME_INTERVAL = 2
+
+
+def _rendition_name(source: str, signature, width: int, height: int) -> str:
+    """Stable file name for the rendition of one version of a source file"""
+    size, mtime_ns = signature
+    digest = hashlib.blake2b(
+        f"{source}|{size}|{mtime_ns}|{width}x{height}".encode(), digest_size=8
+    ).hexdigest()
+    return f"{Path(source).stem}.{digest}{RENDITION_SUFFIX}"
+
+
+class Transcoder:
+    """Background ffmpeg queue producing Pi-friendly renditions of uploaded videos
+
+    Renditions are H.264 at no more than the display resolution, with the moov
+    index at the front and a fixed keyframe interval. They are written to
+    <cache_dir>/renditions next to nothing the media index watches, and are
+    named after the source path, size and mtime, so a replaced upload never
+    picks up a stale rendition. Sources that already fit are played as-is.
+    """
+        
+    def __init__(self, settings, media_index: MediaIndex, catalog: MediaCatalog):
+        self.settings = settings
+        self.media_index = media_index
+        self.catalog = catalog
+        
+        self.enabled = settings.media.transcode_enabled
+        self.output_dir = Path(settings.media.cache_dir) / "renditions"
+        self.width = settings.display.width
+        self.height = settings.display.height
+        self.threads = settings.media.transcode_threads
+        self.worker_count = max(1, settings.media.transcode_workers)
+        
+        self.ffmpeg = shutil.which("ffmpeg")
+        
+        self.renditions: Dict[str, str] = {}  # source path -> ready rendition path
+        
+        self._jobs = JobQueue(self._process, "Transcode")
+        self._listeners: List[Callable] = []
+        
+        media_index.subscribe(self._on_media_change)
+        
+    def subscribe(self, callback: Callable):
+        """Register callback(source) for when a rendition becomes ready"""
+        self._listeners.append(callback)
+        
+    def rendition_for(self, source: str) -> Optional[str]:
+        """Ready rendition of the current version of a source, if any"""
+        rendition = self.renditions.get(source)
+        signature = self.media_index.entries('videos').get(source)
+        if rendition is None or signature is None:
+            return None
+        if Path(rendition).name != _rendition_name(source, signature, self.width, self.height):
+            # Source changed since this rendition was made
+            return None
+        return rendition
+        
+    async def start(self):
+        """Adopt existing renditions, drop orphans and queue what is missing"""
+        if not self.enabled:
+            return
+        if not self.ffmpeg:
+            logger.warning("ffmpeg not installed, videos will play as uploaded")
+            return
+        
+        wanted = {}
+        for source, signature in self.media_index.entries('videos').items():
+            wanted[_rendition_name(source, signature, self.width, self.height)] = source
+        self.renditions.update(await adopt_outputs(self.output_dir, wanted))
+        
+        for source in sorted(self.media_index.entries('videos')):
+            if source not in self.renditions:
+                self._jobs.put(source)
+        
+        self._jobs.start(self.worker_count)
+        logger.info(
+            f"Transcoder ready: {len(self.renditions)} renditions, {self._jobs.qsize()} queued"
+        )
+        
+    def _on_media_change(self, change: MediaChange):
+        if change.kind != 'videos' or not self._jobs.running:
+            return
+        
+        for source in change.removed:
+            rendition = self.renditions.pop(source, None)
+            if rendition:
+                remove_file(Path(rendition))
+        
+        for source in change.added + change.modified:
+            self._jobs.put(source)
+        
+    async def _process(self, source: str):
+        signature = self.media_index.entries('videos').get(source)
+        if signature is None or self.rendition_for(source):
+            return
+        
+        if await self._already_suitable(source):
+            logger.info(f"{Path(source).name} already suits the Pi, not transcoding")
+            return
+        
+        target = self.output_dir / _rendition_name(source, signature, self.width, self.height)
+        partial = target.with_name(target.name + ".part")
+        
+        logger.info(f"Transcoding {Path(source).name}")
+        returncode = await self._run_ffmpeg(source, partial)
+        
+        if returncode != 0 or self.media_index.entries('videos').get(source) != signature:
+            # Failed, or the upload changed underneath us; a new job is queued for that
+            remove_file(partial)
+            if returncode != 0:
+                logger.error(f"ffmpeg exited with {returncode} for {source}")
+            return
+        
+        os.replace(partial, target)
+        previous = self.renditions.get(source)
+        self.renditions[source] = str(target)
+        if previous and previous != str(target):
+            remove_file(Path(previous))
+        
+        logger.info(f"Rendition ready: {target.name}")
+        for callback in self._listeners:
+            try:
+                result = callback(source)
+                if asyncio.iscoroutine(result):
+                    await result
+            except Exception as e:
+                logger.error(f"Rendition listener failed: {e}")
+        
+    async def _already_suitable(self, source: str) -> bool:
+        """H.264 in an MP4 with faststart, no larger than the display"""
+        if Path(source).suffix.lower() not in PASSTHROUGH_CONTAINERS:
+            return False
+        
+        entry = self.catalog.get(source)
+        loop = asyncio.get_running_loop()
+        if entry and entry.probed and entry.codec:
+            info = {'codec': entry.codec, 'width': entry.width, 'height': entry.height}
+        else:
+            try:
+                info = await loop.run_in_executor(None, probe_video, source)
+            except Exception:
+                return False
+        
+        if info.get('codec') != 'h264':
+            return False
+        if (info.get('width') or 0) > self.width or (info.get('height') or 0) > self.height:
+            return False
+        return await loop.run_in_executor(None, is_faststart, source)
+        
+    def _build_command(self, source: str, output: Path) -> List[str]:
+        scale = (
+            f"scale='min({self.width},iw)':'min({self.height},ih)'"
+            ":force_original_aspect_ratio=decrease:force_divisible_by=2"
+        )
+        cmd = [
+            self.ffmpeg, "-nostdin", "-hide_banner", "-loglevel", "error", "-y",
+            "-i", source,
+            "-map", "0:v:0", "-map", "0:a:0?",
+            "-vf", scale,
+            "-c:v", "libx264", "-preset", "veryfast", "-profile:v", "high",
+            "-pix_fmt", "yuv420p",
+            "-force_key_frames", f"expr:gte(t,n_forced*{KEYFRAME_INTERVAL})",
+            "-sc_threshold", "0",
+            "-c:a", "aac", "-b:a", "160k",
+            "-movflags", "+faststart",
+            "-threads", str(self.threads),
+            "-f", "mp4", str(output),
+        ]
+        
+        # Lowest CPU and I/O priority so playback never competes with a job
+        prefix = ["nice", "-n", "19"] if shutil.which("nice") else []
+        if shutil.which("ionice"):
+            prefix += ["ionice", "-c", "3"]
+        return prefix + cmd
+        
+    async def _run_ffmpeg(self, source: str, output: Path) -> int:
+        process = await asyncio.create_subprocess_exec(
+            *self._build_command(source, output),
+            stdout=asyncio.subprocess.DEVNULL,
+            stderr=asyncio.subprocess.PIPE
+        )
+        try:
+            _, stderr = await process.communicate()
+        except asyncio.CancelledError:
+            process.kill()
+            await process.wait()
+            raise
+        
+        if process.returncode != 0 and stderr:
+            logger.debug(stderr.decode(errors='replace').strip()[-500:])
+        return process.returncode
+        
+    async def stop(self):
+        """Cancel workers, killing any running ffmpeg"""
+        await self._jobs.stop()
\ No newline at end of file
@@ -0,0 +1,89 @@
+import logging
+import statistics
+from collections import deque
+from typing import Dict
+
+logger = logging.getLogger(__name__)
+
+
+class LatencyStats:
+    """Rolling window of latency samples with summary statistics"""
+        
+    def __init__(self, name: str, window: int = 100):
+        self.name = name
+        self.samples = deque(maxlen=window)
+        self.total_count = 0
+        
+    def record(self, seconds: float):
+        """Record one latency sample"""
+        self.samples.append(seconds)
+        self.total_count += 1
+        logger.info(f"{self.name}: {seconds * 1000:.0f} ms")
+        
+    def record_ns(self, start_ns: int, end_ns: int):
+        """Record a sample from a pair of monotonic_ns timestamps"""
+        self.record((end_ns - start_ns) / 1e9)
+        
+    def summary(self) -> Dict[str, float]:
+        """Return count and min/mean/p95/max in milliseconds"""
+        if not self.samples:
+            return {'count': 0}
+        
+        ordered = sorted(self.samples)
+        p95_index = min(len(ordered) - 1, int(round(0.95 * (len(ordered) - 1))))
+        return {
+            'count': self.total_count,
+            'min_ms': ordered[0] * 1000,
+            'mean_ms': statistics.fmean(ordered) * 1000,
+            'p95_ms': ordered[p95_index] * 1000,
+            'max_ms': ordered[-1] * 1000,
+        }
+        
+    def log_summary(self):
+        """Log the current summary at info level"""
+        summary = self.summary()
+        if not summary['count']:
+            logger.info(f"{self.name}: no samples")
+            return
+        
+        logger.info(
+            f"{self.name}: n={summary['count']} "
+            f"min={summary['min_ms']:.0f} ms mean={summary['mean_ms']:.0f} ms "
+            f"p95={summary['p95_ms']:.0f} ms max={summary['max_ms']:.0f} ms"
+        )
+
+
+class FrameStats:
+    """Displayed and dropped frame counts per playback, grouped by decode path"""
+        
+    def __init__(self, name: str):
+        self.name = name
+        self.totals = {}  # decoder -> [playbacks, displayed, dropped]
+        
+    def record(self, video: str, decoder: str, displayed: int, dropped: int):
+        """Record the frame counters of one finished playback"""
+        shown = displayed + dropped
+        percent = 100 * dropped / shown if shown else 0.0
+        logger.info(
+            f"{self.name}: {video} via {decoder}, {displayed} frames shown, "
+            f"{dropped} dropped ({percent:.1f}%)"
+        )
+        
+        totals = self.totals.setdefault(decoder, [0, 0, 0])
+        totals[0] += 1
+        totals[1] += displayed
+        totals[2] += dropped
+        
+    def log_summary(self):
+        """Log dropped-frame rates per decode path"""
+        if not self.totals:
+            logger.info(f"{self.name}: no samples")
+            return
+        
+        for decoder, (playbacks, displayed, dropped) in sorted(self.totals.items()):
+            shown = displayed + dropped
+            percent = 100 * dropped / shown if shown else 0.0
+            logger.info(
+                f"{self.name}: {decoder} n={playbacks} shown={displayed} "
+                f"dropped={dropped} ({percent:.1f}%)"
+            )
\ No newline at end of file
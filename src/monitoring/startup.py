@@ -0,0 +1,61 @@
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def _uptime() -> Optional[float]:
+    """Seconds since the kernel booted, if /proc/uptime is readable"""
+    try:
+        with open("/proc/uptime") as f:
+            return float(f.read().split()[0])
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class StartupTimeline:
+    """Per-phase offsets and durations from process start, logged as one table"""
+        
+    def __init__(self):
+        self.started = time.monotonic()
+        # Lets the log show boot-to-first-slide, not just process-to-first-slide
+        self.uptime_at_start = _uptime()
+        self.phases: List[Tuple[str, float, float]] = []  # (name, offset, duration)
+        
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started
+        
+    @asynccontextmanager
+    async def phase(self, name: str):
+        """Time the enclosed block as one phase; phases may overlap"""
+        offset = self.elapsed()
+        try:
+            yield
+        finally:
+            self.phases.append((name, offset, self.elapsed() - offset))
+        
+    async def run(self, name: str, coro):
+        """Await a coroutine as a named phase, e.g. inside asyncio.gather"""
+        async with self.phase(name):
+            return await coro
+        
+    def mark(self, name: str):
+        """Record a milestone with no duration"""
+        self.phases.append((name, self.elapsed(), 0.0))
+        
+    def log(self):
+        """Log the timeline in start order"""
+        logger.info("Startup timeline (offset from process start, duration):")
+        for name, offset, duration in sorted(self.phases, key=lambda phase: phase[1]):
+            suffix = f"{duration:7.3f}s" if duration else "      -"
+            logger.info(f"  {name:<22} +{offset:7.3f}s {suffix}")
+        
+        total = self.elapsed()
+        if self.uptime_at_start is not None:
+            logger.info(
+                f"Startup took {total:.3f}s ({self.uptime_at_start + total:.1f}s since boot)"
+            )
+        else:
+            logger.info(f"Startup took {total:.3f}s")
@@ -1,10 +1,22 @@
-import asyncio
 import logging
-import subprocess
-from pathlib import Path
+
+from .command_runner import CommandRunner, Step
+from .config_files import write_if_changed
 
 logger = logging.getLogger(__name__)
 
+AP_ADDRESS = "192.168.4.1/24"
+
+HOSTAPD_CONF = "/tmp/hostapd.conf"
+DNSMASQ_CONF = "/tmp/dnsmasq.conf"
+
+# Match the daemons this module starts, not ones started by their systemd units
+HOSTAPD_PATTERN = f"'^hostapd {HOSTAPD_CONF}'"
+DNSMASQ_PATTERN = f"'^dnsmasq -C {DNSMASQ_CONF}'"
+
+# Shutdown should not hang on a wedged daemon
+STOP_TIMEOUT = 5.0
+
 
 class AccessPointManager:
     def __init__(self, settings):
@@ -21,13 +33,13 @@ class AccessPointManager:
         
         try:
             # Configure hostapd
-            await self._configure_hostapd()
+            hostapd_changed = self._configure_hostapd()
             
             # Configure dnsmasq
-            await self._configure_dnsmasq()
+            dnsmasq_changed = self._configure_dnsmasq()
             
-            # Start services
-            await self._start_services()
+            # Start services, reloading only what was reconfigured
+            await self._start_services(hostapd_changed, dnsmasq_changed)
             
             self.is_running = True
             logger.info("WiFi access point started successfully")
@@ -36,8 +48,8 @@ class AccessPointManager:
             logger.error(f"Failed to start access point: {e}")
             raise
             
-    async def _configure_hostapd(self):
-        """Configure hostapd for WiFi AP"""
+    def _configure_hostapd(self) -> bool:
+        """Configure hostapd for WiFi AP; True if the config changed"""
         config = f"""
 interface={self.interface}
 driver=nl80211
@@ -55,65 +67,78 @@ wpa_pairwise=TKIP
 rsn_pairwise=CCMP
 """
         
-        config_file = Path("/tmp/hostapd.conf")
-        config_file.write_text(config)
-        
-        logger.debug(f"Hostapd configuration written to {config_file}")
+        return write_if_changed(HOSTAPD_CONF, config)
         
-    async def _configure_dnsmasq(self):
-        """Configure dnsmasq for DHCP"""
+    def _configure_dnsmasq(self) -> bool:
+        """Configure dnsmasq for DHCP; True if the config changed"""
         config = f"""
 interface={self.interface}
 dhcp-range=192.168.4.2,192.168.4.20,255.255.255.0,24h
 """
         
-        config_file = Path("/tmp/dnsmasq.conf")
-        config_file.write_text(config)
-        
-        logger.debug(f"Dnsmasq configuration written to {config_file}")
+        return write_if_changed(DNSMASQ_CONF, config)
         
-    async def _start_services(self):
-        """Start hostapd and dnsmasq services"""
-        # Configure network interface
-        commands = [
-            f"sudo ip link set {self.interface} up",
-            f"sudo ip addr add 192.168.4.1/24 dev {self.interface}",
-            "sudo systemctl stop hostapd",
-            "sudo systemctl stop dnsmasq",
-            "sudo hostapd /tmp/hostapd.conf -B",
-            "sudo dnsmasq -C /tmp/dnsmasq.conf"
+    async def _start_services(self, hostapd_changed=True, dnsmasq_changed=True):
+        """Bring up the interface and start hostapd and dnsmasq
+
+        Steps that are already in place, such as the address from a previous
+        run, are skipped; the interface and the two daemons are set up
+        concurrently. A running hostapd rereads a changed config on SIGHUP;
+        dnsmasq does not reread its -C file, so it is restarted instead.
+        """
+        interface = self.interface
+        steps = [
+            Step("link up", f"sudo ip link set {interface} up",
+                 check=f"ip -o link show dev {interface} | grep -q '[<,]UP[,>]'"),
+            Step("address", f"sudo ip addr add {AP_ADDRESS} dev {interface}",
+                 check=f"ip -o -4 addr show dev {interface} | grep -q ' {AP_ADDRESS} '"),
+            Step("stop hostapd unit", "sudo systemctl stop hostapd",
+                 check="! systemctl is-active --quiet hostapd"),
+            Step("stop dnsmasq unit", "sudo systemctl stop dnsmasq",
+                 check="! systemctl is-active --quiet dnsmasq"),
+            Step("hostapd", self._hostapd_command(hostapd_changed),
+                 check=None if hostapd_changed else f"pgrep -f {HOSTAPD_PATTERN} >/dev/null",
+                 after=("link up", "stop hostapd unit")),
+            Step("dnsmasq", self._dnsmasq_command(dnsmasq_changed),
+                 check=None if dnsmasq_changed else f"pgrep -f {DNSMASQ_PATTERN} >/dev/null",
+                 after=("address", "stop dnsmasq unit")),
         ]
+        await CommandRunner("AP services").run(steps)
         
-        for cmd in commands:
-            try:
-                result = await asyncio.create_subprocess_shell(
-                    cmd,
-                    stdout=asyncio.subprocess.PIPE,
-                    stderr=asyncio.subprocess.PIPE
-                )
-                stdout, stderr = await result.communicate()
-                
-                if result.returncode != 0:
-                    logger.warning(f"Command '{cmd}' failed: {stderr.decode()}")
-                    
-            except Exception as e:
-                logger.error(f"Failed to execute '{cmd}': {e}")
+    @staticmethod
+    def _hostapd_command(changed: bool) -> str:
+        start = f"sudo hostapd {HOSTAPD_CONF} -B"
+        if not changed:
+            return start
+        # pkill exits 1 when nothing matched, i.e. hostapd is not running yet
+        return f"sudo pkill -HUP -f {HOSTAPD_PATTERN} || {start}"
+        
+    @staticmethod
+    def _dnsmasq_command(changed: bool) -> str:
+        start = f"sudo dnsmasq -C {DNSMASQ_CONF}"
+        if not changed:
+            return start
+        # The old instance must release port 53 before the new one binds it
+        return (
+            f"sudo pkill -f {DNSMASQ_PATTERN}; "
+            f"while pgrep -f {DNSMASQ_PATTERN} >/dev/null; do sleep 0.1; done; {start}"
+        )
                 
     async def stop(self):
         """Stop the WiFi access point"""
         logger.info("Stopping WiFi access point")
         
-        commands = [
-            "sudo pkill hostapd",
-            "sudo pkill dnsmasq",
-            f"sudo ip addr del 192.168.4.1/24 dev {self.interface}",
-            f"sudo ip link set {self.interface} down"
+        steps = [
+            Step("stop hostapd", "sudo pkill hostapd", timeout=STOP_TIMEOUT),
+            Step("stop dnsmasq", "sudo pkill dnsmasq", timeout=STOP_TIMEOUT),
+            Step("address", f"sudo ip addr del {AP_ADDRESS} dev {self.interface}",
+                 after=("stop dnsmasq",), timeout=STOP_TIMEOUT),
+            Step("link down", f"sudo ip link set {self.interface} down",
+                 after=("stop hostapd", "address"), timeout=STOP_TIMEOUT),
         ]
-        
-        for cmd in commands:
-            try:
-                await asyncio.create_subprocess_shell(cmd)
-            except Exception as e:
-                logger.warning(f"Error stopping AP: {e}")
+        try:
+            await CommandRunner("AP shutdown").run(steps)
+        except Exception as e:
+            logger.warning(f"Error stopping AP: {e}")
                 
         self.is_running = False
\ No newline at end of file
@@ -0,0 +1,212 @@
+import asyncio
+import logging
+import os
+import signal
+import time
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+# Seconds a step may take before it is killed and counted as failed
+DEFAULT_TIMEOUT = 15.0
+
+# A shell string, or an argv list run without a shell
+Command = Union[str, Sequence[str]]
+
+
+@dataclass(frozen=True)
+class CommandResult:
+    """Outcome of one command"""
+    returncode: Optional[int]  # None when the command timed out or could not start
+    stdout: str = ""
+    stderr: str = ""
+    duration: float = 0.0
+        
+    @property
+    def ok(self) -> bool:
+        return self.returncode == 0
+
+
+@dataclass(frozen=True)
+class Step:
+    """One system command in a plan, with what it waits for and when it can be skipped"""
+    name: str
+    command: Command
+    check: Union[Command, bool, None] = None  # skip when it exits 0 or is True
+    after: Tuple[str, ...] = ()
+    changed_by: Tuple[str, ...] = ()  # run despite check if any of these ran
+    input: Optional[str] = None
+    timeout: float = DEFAULT_TIMEOUT
+
+
+@dataclass
+class StepResult:
+    name: str
+    status: str  # "ran", "skipped" or "failed"
+    duration: float = 0.0
+    detail: str = ""
+        
+    @property
+    def ran(self) -> bool:
+        return self.status == "ran"
+
+
+async def run_command(command: Command, timeout: float = DEFAULT_TIMEOUT,
+                      input: Optional[str] = None) -> CommandResult:
+    """Run a command without blocking the loop, killing it after timeout seconds"""
+    started = time.monotonic()
+    try:
+        if isinstance(command, str):
+            process = await asyncio.create_subprocess_shell(
+                command,
+                stdin=asyncio.subprocess.PIPE if input is not None else asyncio.subprocess.DEVNULL,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+                start_new_session=True
+            )
+        else:
+            process = await asyncio.create_subprocess_exec(
+                *command,
+                stdin=asyncio.subprocess.PIPE if input is not None else asyncio.subprocess.DEVNULL,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+                start_new_session=True
+            )
+    except OSError as e:
+        return CommandResult(None, stderr=str(e), duration=time.monotonic() - started)
+    
+    try:
+        stdout, stderr = await asyncio.wait_for(
+            process.communicate(input.encode() if input is not None else None), timeout
+        )
+    except asyncio.TimeoutError:
+        await _kill(process)
+        return CommandResult(
+            None, stderr=f"timed out after {timeout:g}s", duration=time.monotonic() - started
+        )
+    except asyncio.CancelledError:
+        await _kill(process)
+        raise
+    
+    return CommandResult(
+        process.returncode,
+        stdout.decode(errors='replace'),
+        stderr.decode(errors='replace'),
+        time.monotonic() - started
+    )
+
+
+async def _kill(process):
+    """Kill a command with everything it spawned, which may hold its pipes open"""
+    try:
+        os.killpg(process.pid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
+    except PermissionError:
+        # Every process in the group runs as root, e.g. sudo itself; waiting
+        # for one we cannot kill would hang the step forever
+        logger.warning(f"Cannot kill timed out command (pid {process.pid}), leaving it running")
+        return
+    await process.wait()
+
+
+def check_plan(steps: List[Step]):
+    """Raise ValueError unless step names are unique and their order is acyclic"""
+    by_name = {}
+    for step in steps:
+        if step.name in by_name:
+            raise ValueError(f"Duplicate step name: {step.name}")
+        by_name[step.name] = step
+    for step in steps:
+        unknown = set(step.after + step.changed_by) - by_name.keys()
+        if unknown:
+            raise ValueError(f"Step {step.name} waits for unknown steps: {sorted(unknown)}")
+    
+    done = set()
+    for step in steps:
+        # Depth-first walk; a step met again while still on the path is a cycle
+        path = [step.name]
+        pending = [iter(step.after + step.changed_by)]
+        while pending:
+            name = next(pending[-1], None)
+            if name is None:
+                done.add(path.pop())
+                pending.pop()
+            elif name in path:
+                cycle = path[path.index(name):] + [name]
+                raise ValueError(f"Steps wait for each other: {' -> '.join(cycle)}")
+            elif name not in done:
+                path.append(name)
+                pending.append(iter(by_name[name].after + by_name[name].changed_by))
+
+
+class CommandRunner:
+    """Runs a plan of steps, each as soon as the steps it comes after are done
+
+    Steps with no ordering between them run concurrently. A failed step is
+    logged and does not stop the rest, as the services are brought up on a
+    best-effort basis.
+    """
+        
+    def __init__(self, name: str):
+        self.name = name
+        
+    async def run(self, steps: Iterable[Step]) -> Dict[str, StepResult]:
+        steps = list(steps)
+        check_plan(steps)
+        
+        started = time.monotonic()
+        tasks: Dict[str, asyncio.Task] = {}
+            
+        async def run_after(step: Step) -> StepResult:
+            for name in step.after + step.changed_by:
+                await asyncio.shield(tasks[name])
+            changed = any(tasks[name].result().ran for name in step.changed_by)
+            return await self._run_step(step, changed)
+        
+        for step in steps:
+            tasks[step.name] = asyncio.ensure_future(run_after(step))
+        try:
+            results = await asyncio.gather(*tasks.values())
+        except BaseException:
+            for task in tasks.values():
+                task.cancel()
+            raise
+        
+        self._log_summary(results, time.monotonic() - started)
+        return {result.name: result for result in results}
+        
+    async def _run_step(self, step: Step, changed: bool) -> StepResult:
+        started = time.monotonic()
+        
+        if step.check is not None and not changed:
+            if isinstance(step.check, bool):
+                holds = step.check
+            else:
+                holds = (await run_command(step.check, step.timeout)).ok
+            if holds:
+                result = StepResult(step.name, "skipped", time.monotonic() - started)
+                logger.debug(f"{self.name}: {step.name} already done ({result.duration:.3f}s)")
+                return result
+        
+        outcome = await run_command(step.command, step.timeout, step.input)
+        duration = time.monotonic() - started
+        if outcome.ok:
+            logger.debug(f"{self.name}: {step.name} ran in {duration:.3f}s")
+            return StepResult(step.name, "ran", duration)
+        
+        detail = outcome.stderr.strip() or f"exit status {outcome.returncode}"
+        logger.warning(f"{self.name}: {step.name} failed after {duration:.3f}s: {detail}")
+        return StepResult(step.name, "failed", duration, detail)
+        
+    def _log_summary(self, results: List[StepResult], total: float):
+        counts = {status: sum(1 for result in results if result.status == status)
+                  for status in ("ran", "skipped", "failed")}
+        timings = ", ".join(
+            f"{result.name} {result.status} {result.duration:.2f}s" for result in results
+        )
+        logger.info(
+            f"{self.name}: {counts['ran']} ran, {counts['skipped']} skipped, "
+            f"{counts['failed']} failed in {total:.2f}s ({timings})"
+        )
\ No newline at end of file
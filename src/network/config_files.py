@@ -0,0 +1,32 @@
+import hashlib
+import logging
+from pathlib import Path
+from typing import Optional, Union
+
+from config.persistence import atomic_write
+
+logger = logging.getLogger(__name__)
+
+
+def content_hash(content: Union[str, bytes]) -> str:
+    """SHA-256 of a rendered config"""
+    if isinstance(content, str):
+        content = content.encode()
+    return hashlib.sha256(content).hexdigest()
+
+
+def file_hash(path: Union[str, Path]) -> Optional[str]:
+    """SHA-256 of an installed config, or None if it is missing or unreadable"""
+    try:
+        return content_hash(Path(path).read_bytes())
+    except OSError:
+        return None
+
+
+def write_if_changed(path: Union[str, Path], content: str, mode: int = 0o600) -> bool:
+    """Write a rendered config unless the file already holds it; True if written
+
+    The file is replaced atomically, so a daemon never reads half a config.
+    """
+    # No .bak: these are rendered from the settings again at every start
+    return atomic_write(path, content, mode=mode, backup=False)
\ No newline at end of file
@@ -1,10 +1,13 @@
-import asyncio
 import logging
-import subprocess
-from pathlib import Path
+
+from .command_runner import CommandRunner, Step, run_command
+from .config_files import content_hash, file_hash, write_if_changed
 
 logger = logging.getLogger(__name__)
 
+SMB_CONF = "/etc/samba/smb.conf"
+STAGED_SMB_CONF = "/tmp/smb.conf"
+
 
 class SMBServer:
     def __init__(self, settings):
@@ -21,24 +24,25 @@ class SMBServer:
         logger.info("Starting SMB server")
         
         try:
-            # Configure Samba
-            await self._configure_samba()
-            
-            # Set SMB user password
-            await self._set_user_password()
-            
-            # Start/restart Samba service
-            await self._start_service()
+            # The share config and the account are independent; smbd is only
+            # told to reload when its config changed, and started if not running
+            steps = [
+                self._configure_samba(),
+                *self._user_steps(),
+                self._service_step(),
+            ]
+            await CommandRunner("SMB setup").run(steps)
             
             self.is_running = True
-            logger.info(f"SMB server started - share: \\\\{self._get_ip()}\\{self.share_name}")
+            ip = await self._get_ip()
+            logger.info(f"SMB server started - share: \\\\{ip}\\{self.share_name}")
             
         except Exception as e:
             logger.error(f"Failed to start SMB server: {e}")
             raise
             
-    async def _configure_samba(self):
-        """Configure Samba shares"""
+    def _configure_samba(self) -> Step:
+        """Render the share config; the returned step installs it if it differs"""
         config = f"""
 [global]
    workgroup = WORKGROUP
@@ -58,83 +62,58 @@ class SMBServer:
    directory mask = 0755
 """
         
-        config_file = Path("/tmp/smb.conf")
-        config_file.write_text(config)
+        installed = file_hash(SMB_CONF) == content_hash(config)
+        if not installed:
+            write_if_changed(STAGED_SMB_CONF, config)
         
         # Copy to system location (requires sudo)
-        try:
-            cmd = "sudo cp /tmp/smb.conf /etc/samba/smb.conf"
-            result = await asyncio.create_subprocess_shell(
-                cmd,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE
-            )
-            await result.communicate()
-            
-        except Exception as e:
-            logger.error(f"Failed to configure Samba: {e}")
-            
-    async def _set_user_password(self):
-        """Set SMB user password"""
-        try:
-            # Create system user if not exists
-            cmd = f"sudo useradd -M -s /sbin/nologin {self.username} 2>/dev/null || true"
-            await asyncio.create_subprocess_shell(cmd)
-            
-            # Set SMB password
-            cmd = f"echo '{self.password}\\n{self.password}' | sudo smbpasswd -a -s {self.username}"
-            result = await asyncio.create_subprocess_shell(
-                cmd,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE
-            )
-            await result.communicate()
+        return Step(
+            "config",
+            ["sudo", "install", "-m", "0644", STAGED_SMB_CONF, SMB_CONF],
+            check=installed
+        )
             
-            # Enable SMB user
-            cmd = f"sudo smbpasswd -e {self.username}"
-            await asyncio.create_subprocess_shell(cmd)
+    def _user_steps(self):
+        """Create the system user, then set and enable its SMB password"""
+        # smbpasswd reads the password twice from stdin, keeping it off the command line
+        return [
+            Step("system user", ["sudo", "useradd", "-M", "-s", "/sbin/nologin", self.username],
+                 check=["id", "-u", self.username]),
+            Step("password", ["sudo", "smbpasswd", "-a", "-s", self.username],
+                 input=f"{self.password}\n{self.password}\n", after=("system user",)),
+            Step("enable user", ["sudo", "smbpasswd", "-e", self.username],
+                 after=("password",)),
+        ]
             
-        except Exception as e:
-            logger.error(f"Failed to set SMB user password: {e}")
-            
-    async def _start_service(self):
-        """Start or restart Samba service"""
-        try:
-            cmd = "sudo systemctl restart smbd"
-            result = await asyncio.create_subprocess_shell(
-                cmd,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE
-            )
-            await result.communicate()
-            
-        except Exception as e:
-            logger.error(f"Failed to start Samba service: {e}")
+    def _service_step(self) -> Step:
+        """Start smbd, or have a running smbd reread a replaced config
+
+        reload-config keeps existing sessions, so an upload in progress
+        survives; smbcontrol fails when smbd is not running, which starts it.
+        """
+        return Step(
+            "smbd",
+            "sudo smbcontrol smbd reload-config 2>/dev/null || sudo systemctl restart smbd",
+            check=["systemctl", "is-active", "--quiet", "smbd"],
+            changed_by=("config",)
+        )
             
-    def _get_ip(self):
+    async def _get_ip(self):
         """Get the IP address for SMB access"""
         if self.settings.network.enable_ap:
             return "192.168.4.1"
-        else:
-            # Get system IP
-            try:
-                result = subprocess.run(
-                    ["hostname", "-I"],
-                    capture_output=True,
-                    text=True
-                )
-                return result.stdout.strip().split()[0]
-            except:
-                return "localhost"
+        
+        # Get system IP
+        result = await run_command(["hostname", "-I"], timeout=2.0)
+        addresses = result.stdout.split() if result.ok else []
+        return addresses[0] if addresses else "localhost"
                 
     async def stop(self):
         """Stop the SMB server"""
         logger.info("Stopping SMB server")
         
-        try:
-            cmd = "sudo systemctl stop smbd"
-            await asyncio.create_subprocess_shell(cmd)
-        except Exception as e:
-            logger.warning(f"Error stopping SMB: {e}")
+        result = await run_command(["sudo", "systemctl", "stop", "smbd"], timeout=5.0)
+        if not result.ok:
+            logger.warning(f"Error stopping SMB: {result.stderr.strip()}")
             
         self.is_running = False
\ No newline at end of file